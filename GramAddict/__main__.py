@@ -40,6 +40,21 @@ def cmd_run(args):
     start_bot()
 
 
+def cmd_compact(args):
+    from GramAddict.core.storage import ARCHIVE, create_storage
+
+    for username in args.account_name:
+        if not path.exists(f"./accounts/{username}"):
+            print(f"'accounts/{username}' folder doesn't exist, skip.")
+            continue
+        storage = create_storage(username, args.storage_engine)
+        interacted, filtered = storage.archive(args.older_than)
+        storage.close()
+        print(
+            f"{username}: {interacted} interacted user(s) and {filtered} filtered user(s) older than {args.older_than} days moved to 'accounts/{username}/{ARCHIVE}'."
+        )
+
+
 def cmd_dump(args):
     import os
     import shutil
@@ -99,6 +114,30 @@ _commands = [
             dict(args=["--config"], nargs="?", help="provide the config.yml path"),
         ],
     ),
+    dict(
+        action=cmd_compact,
+        command="compact",
+        help="moves the old interacted and filtered users in a compressed archive to keep the account files small",
+        flags=[
+            dict(
+                args=["account_name"],
+                nargs="+",
+                help="instagram account name to compact",
+            ),
+            dict(
+                args=["--older-than"],
+                type=int,
+                default=90,
+                help="archive the records older than these days, the users still followed are always kept",
+            ),
+            dict(
+                args=["--storage-engine"],
+                choices=["json", "journal", "sqlite"],
+                default="json",
+                help="the storage-engine used in your config.yml",
+            ),
+        ],
+    ),
     dict(
         action=cmd_dump,
         command="dump",
@@ -0,0 +1,94 @@
+import logging
+import re
+from functools import lru_cache
+from time import sleep
+from typing import Optional
+
+from adbutils import AdbError, adb  # already required by uiautomator2
+
+logger = logging.getLogger(__name__)
+
+# seconds we wait for a shell command before giving up
+SHELL_TIMEOUT = 30
+
+
+class AdbShell:
+    """
+    Shell commands sent to the adb server socket that uiautomator2 already uses,
+    instead of spawning an adb process for every query. The parsing of the
+    outputs is kept here too.
+    """
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self._device = None
+
+    def _get_device(self):
+        if self._device is None:
+            self._device = adb.device(serial=self.serial)
+        return self._device
+
+    def shell(self, cmd: str) -> Optional[str]:
+        """the output of the command, None if the device can't be reached"""
+        try:
+            return self._get_device().shell(cmd, timeout=SHELL_TIMEOUT)
+        except (AdbError, OSError) as e:
+            logger.debug(f"'adb shell {cmd}' failed: {e}")
+            # the device could have been reconnected with another transport
+            self._device = None
+            return None
+
+    def devices_count(self) -> int:
+        # sometimes it needs two requests to wake up...
+        for attempt in range(2):
+            try:
+                devices = adb.device_list()
+            except (AdbError, OSError) as e:
+                logger.debug(f"Can't list the devices connected to adb: {e}")
+                devices = []
+            if devices or attempt == 1:
+                return len(devices)
+            sleep(1)
+
+    def dumpsys_flag(self, service: str, flag: str) -> Optional[bool]:
+        """value of `flag=true|false` in `dumpsys service`, None if it's not there"""
+        output = self.shell(f"dumpsys {service}")
+        if not output:
+            logger.debug(f"'adb shell dumpsys {service}' returns nothing!")
+            return None
+        match = re.search(f"{flag}=(true|false)", output)
+        return None if match is None else match.group(1) == "true"
+
+    def get_setting(self, namespace: str, key: str) -> Optional[str]:
+        output = self.shell(f"settings get {namespace} {key}")
+        return None if output is None else output.strip()
+
+    def put_setting(self, namespace: str, key: str, value) -> bool:
+        return self.shell(f"settings put {namespace} {key} {value}") is not None
+
+    def package_version(self, package: str) -> Optional[str]:
+        version_match = re.findall(
+            r"versionName=(\S+)", self.shell(f"dumpsys package {package}") or ""
+        )
+        return version_match[0] if len(version_match) == 1 else None
+
+    def set_ime(self, ime: str) -> bool:
+        """False if the keyboard isn't installed"""
+        output = self.shell(f"ime set {ime}")
+        if output is None or output.startswith("Error:"):
+            logger.debug(output)
+            return False
+        return True
+
+    def open_url(self, url: str) -> bool:
+        output = self.shell(f"am start -a android.intent.action.VIEW -d '{url}'")
+        if output is None or "Error" in output:
+            logger.debug(output)
+            return False
+        return True
+
+
+@lru_cache(maxsize=None)
+def get_adb_shell(serial=None) -> AdbShell:
+    """one AdbShell per device"""
+    return AdbShell(serial)
@@ -20,7 +20,7 @@ from GramAddict.core.navigation import check_if_english
 from GramAddict.core.persistent_list import PersistentList
 from GramAddict.core.report import print_full_report
 from GramAddict.core.session_state import SessionState, SessionStateEncoder
-from GramAddict.core.storage import Storage
+from GramAddict.core.storage import create_storage
 from GramAddict.core.utils import (
     ask_for_a_donation,
     can_repeat,
@@ -43,6 +43,7 @@ from GramAddict.core.utils import (
     print_telegram_reports,
     restart_atx_agent,
     save_crash,
+    save_rpc_stats,
     set_time_delta,
     show_ending_conditions,
     stop_bot,
@@ -99,7 +100,13 @@ def start_bot(**kwargs):
             "You have to specify one of these actions: " + ", ".join(configs.actions)
         )
         return
-    device = create_device(configs.device_id, configs.app_id)
+    device = create_device(
+        configs.device_id,
+        configs.app_id,
+        configs.args.adaptive_ui_timeouts,
+        configs.args.rpc_stats,
+        configs.args.record_screens,
+    )
     session_state = None
     if str(configs.args.total_sessions) != "-1":
         total_sessions = get_value(configs.args.total_sessions, None, -1)
@@ -251,7 +258,14 @@ def start_bot(**kwargs):
         logger.info(
             f"There is/are {len(jobs_list)-len(unfollow_jobs)} active-job(s) and {len(unfollow_jobs)} unfollow-job(s) scheduled for this session."
         )
-        storage = Storage(session_state.my_username)
+        storage = create_storage(
+            session_state.my_username,
+            configs.args.storage_engine,
+            lazy=configs.args.lazy_storage,
+            shared=configs.args.shared_storage is not None,
+        )
+        session_state.start_checkpoint()
+        session_state.set_rolling_limits(storage.interaction_counters)
         filters = Filter(storage)
         show_ending_conditions()
         if not configs.args.debug:
@@ -331,9 +345,16 @@ def start_bot(**kwargs):
                 )
                 print_limits = True
 
-        # save the session in sessions.json
+        # keep the live files small, the old records go in the cold archive
+        if configs.args.archive_older_than is not None:
+            storage.archive(get_value(configs.args.archive_older_than, None, 90))
+        # flush what's pending in the storage
+        storage.close()
+
+        # save the session in sessions.jsonl
         session_state.finishTime = datetime.now()
         sessions.persist(directory=session_state.my_username)
+        session_state.stop_checkpoint()
 
         # print reports
         if telegram_reports_at_end:
@@ -369,6 +390,7 @@ def start_bot(**kwargs):
             + " --------",
             extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
         )
+        save_rpc_stats(device, session_state)
         pre_post_script(pre=False, path=configs.args.post_script)
 
         if configs.args.repeat and can_repeat(len(sessions), total_sessions):
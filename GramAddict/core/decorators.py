@@ -10,6 +10,7 @@ from uiautomator2.exceptions import UiObjectNotFoundError
 
 from GramAddict.core.device_facade import DeviceFacade
 from GramAddict.core.report import print_full_report
+from GramAddict.core.storage import flush_storages
 from GramAddict.core.utils import (
     check_if_crash_popup_is_there,
     close_instagram,
@@ -93,10 +94,12 @@ def run_safely(device, device_id, sessions, session_state, screen_record, config
                 logger.info(
                     f"List of running apps: {', '.join(device.deviceV2.app_list_running())}"
                 )
+                flush_storages()
                 save_crash(device)
                 close_instagram(device)
                 print_full_report(sessions, configs.args.scrape_to_file)
                 sessions.persist(directory=session_state.my_username)
+                session_state.stop_checkpoint()
                 raise e from e
 
         return wrapper
@@ -112,6 +115,9 @@ def restart(
     normal_crash: bool = True,
     print_traceback: bool = True,
 ):
+    flush_storages()
+    # a crash of the agent can be healed without restarting Instagram
+    agent_healed = not device.is_alive() and device.connection.heal()
     if print_traceback:
         logger.error(traceback.format_exc())
         save_crash(device)
@@ -128,11 +134,18 @@ def restart(
             )
             stop_bot(device, sessions, session_state)
         logger.info("Something unexpected happened. Let's try again.")
+    if agent_healed:
+        device.screen_changed()
+        if device._ig_is_opened():
+            logger.info("uiautomator2 is back and Instagram is still opened.")
+            TabBarView(device).navigateToProfile()
+            return
     close_instagram(device)
     check_if_crash_popup_is_there(device)
     random_sleep()
     if not open_instagram(device):
         print_full_report(sessions, configs.args.scrape_to_file)
         sessions.persist(directory=session_state.my_username)
+        session_state.stop_checkpoint()
         sys.exit(2)
     TabBarView(device).navigateToProfile()
@@ -0,0 +1,84 @@
+import logging
+
+import uiautomator2
+
+from GramAddict.core.adb import get_adb_shell
+
+logger = logging.getLogger(__name__)
+
+ATX_AGENT_PATH = "/data/local/tmp/atx-agent"
+# reset_uiautomator() gives up after this many attempts
+HEAL_ATTEMPTS = 2
+
+
+class DeviceConnection:
+    """
+    The one uiautomator2 client of a device, shared by all its DeviceFacades.
+    It's the only place where the agent is stopped, checked and brought back.
+    """
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        try:
+            if device_id is None or "." not in device_id:
+                self.client = uiautomator2.connect(
+                    "" if device_id is None else device_id
+                )
+            else:
+                self.client = uiautomator2.connect_adb_wifi(f"{device_id}")
+        except ImportError:
+            raise ImportError("Please install uiautomator2: pip3 install uiautomator2")
+        self.adb = get_adb_shell(self.client.serial)
+
+    def is_alive(self) -> bool:
+        try:
+            return self.client._is_alive()  # deprecated method
+        except AttributeError:
+            return self.client.server.alive
+
+    def heal(self) -> bool:
+        """bring atx-agent and uiautomator back if they died, True if they're alive"""
+        for attempt in range(1, HEAL_ATTEMPTS + 1):
+            if self.is_alive():
+                return True
+            logger.warning(
+                f"uiautomator2 doesn't answer, restarting it ({attempt}/{HEAL_ATTEMPTS})."
+            )
+            try:
+                # they start atx-agent if it's not running, and then uiautomator
+                self.client._prepare_atx_agent()
+                self.client.reset_uiautomator("not alive")
+            except (uiautomator2.exceptions.BaseError, OSError, RuntimeError) as e:
+                logger.debug(f"Can't restart uiautomator2: {e}")
+            except AttributeError:
+                # this version of uiautomator2 does it by itself at the next request
+                pass
+        alive = self.is_alive()
+        if not alive:
+            logger.error("uiautomator2 is still not answering.")
+        return alive
+
+    def kill_agent(self):
+        logger.info("Kill atx agent.")
+        self.adb.shell("pkill atx-agent")
+
+    def restart_agent(self) -> bool:
+        self.kill_agent()
+        logger.info("Restarting atx agent.")
+        if self.adb.shell(f"{ATX_AGENT_PATH} server -d") is None:
+            logger.error("Failed to restart atx-agent.")
+            return False
+        if self.heal():
+            logger.info("atx-agent restarted successfully.")
+            return True
+        return False
+
+
+_connections = {}
+
+
+def get_connection(device_id) -> DeviceConnection:
+    """connects only the first time a device is asked"""
+    if device_id not in _connections:
+        _connections[device_id] = DeviceConnection(device_id)
+    return _connections[device_id]
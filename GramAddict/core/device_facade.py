@@ -1,25 +1,44 @@
 import logging
 import string
+from base64 import b64encode
+from contextlib import contextmanager
 from datetime import datetime
 from enum import Enum, auto
-from inspect import stack
+from functools import wraps
 from os import getcwd, listdir
 from random import randint, uniform
-from re import search
-from subprocess import PIPE, run
-from time import sleep
+from time import monotonic, sleep
 from typing import Optional
 
 import uiautomator2
 
+from GramAddict.core.device_connection import get_connection
+from GramAddict.core.hierarchy import Hierarchy, node_info
+from GramAddict.core.replay import RecordingDevice, ReplayConnection
+from GramAddict.core.rpc_stats import RpcStats, measure
+from GramAddict.core.ui_timeouts import UiTimeouts
 from GramAddict.core.utils import random_sleep
 
 logger = logging.getLogger(__name__)
 
+# seconds we trust the last foreground app check, taps and swipes invalidate it earlier
+FOREGROUND_APP_TTL = 3.0
+# seconds between two dumps of the screen in wait_any()
+WAIT_ANY_POLL = 0.5
 
-def create_device(device_id, app_id):
+
+def create_device(
+    device_id,
+    app_id,
+    adaptive_timeouts=False,
+    rpc_stats=False,
+    record_screens=None,
+    replay=None,
+):
     try:
-        return DeviceFacade(device_id, app_id)
+        return DeviceFacade(
+            device_id, app_id, adaptive_timeouts, rpc_stats, record_screens, replay
+        )
     except ImportError as e:
         logger.error(str(e))
         return None
@@ -40,6 +59,55 @@ def get_device_info(device):
     logger.debug(f"Device ID: {device.deviceV2.serial}")
 
 
+def on_snapshot(func):
+    """for the methods of the views: their finds are resolved on a single dump"""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.device.snapshot():
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def selector_key(kwargs, index=None) -> str:
+    """how a selector is named in the stats of the UI timeouts"""
+    key = ", ".join(f"{name}={value}" for name, value in sorted(kwargs.items()))
+    return key if index is None else f"{key} [{index}]"
+
+
+def plan_typing(text: str) -> list:
+    """
+    The chunks a human would type text in: the first 1-3 letters of a word one by
+    one and then the rest of it, the final punctuation, the spaces and the newlines
+    """
+    chunks = []
+    sentences = text.splitlines()
+    for j, sentence in enumerate(sentences, start=1):
+        word_list = sentence.split()
+        for n, word in enumerate(word_list, start=1):
+            n_single_letters = randint(1, 3)
+            chunks.extend(word[:n_single_letters])
+            rest = word[n_single_letters:]
+            if len(rest) > 1 and rest[-1] in string.punctuation:
+                chunks.extend([rest[:-1], rest[-1]])
+            elif rest:
+                chunks.append(rest)
+            if n < len(word_list):
+                chunks.append(" ")
+        if j < len(sentences):
+            chunks.append("\n")
+    return chunks
+
+
+def typing_script(chunks: list) -> str:
+    """one shell command sending the chunks to FastInputIME, as send_keys() does"""
+    return "; ".join(
+        f"am broadcast -a ADB_INPUT_TEXT --es text {b64encode(chunk.encode('utf-8')).decode()}"
+        for chunk in chunks
+    )
+
+
 class Timeout(Enum):
     ZERO = auto()
     TINY = auto()
@@ -81,75 +149,211 @@ class Mode(Enum):
 
 
 class DeviceFacade:
-    def __init__(self, device_id, app_id):
+    def __init__(
+        self,
+        device_id,
+        app_id,
+        adaptive_timeouts=False,
+        rpc_stats=False,
+        record_screens=None,
+        replay=None,
+    ):
+        """
+        record_screens: folder where the screen is saved before every action
+        replay: folder of a recording played instead of a real device
+        """
         self.device_id = device_id
         self.app_id = app_id
-        try:
-            if device_id is None or "." not in device_id:
-                self.deviceV2 = uiautomator2.connect(
-                    "" if device_id is None else device_id
-                )
-            else:
-                self.deviceV2 = uiautomator2.connect_adb_wifi(f"{device_id}")
-        except ImportError:
-            raise ImportError("Please install uiautomator2: pip3 install uiautomator2")
+        if replay is not None:
+            self.connection = ReplayConnection(replay)
+        else:
+            self.connection = get_connection(device_id)
+        self.deviceV2 = self.connection.client
+        if record_screens is not None:
+            self.deviceV2 = RecordingDevice(self.deviceV2, record_screens)
+        self.adb = self.connection.adb
+        self.ui_timeouts = (
+            UiTimeouts(self.deviceV2.serial) if adaptive_timeouts else None
+        )
+        self.rpc_stats = RpcStats() if rpc_stats else None
+        self.foreground_app = None
+        self.foreground_app_checked_at = 0.0
+        self._hierarchy = None
+        self._hierarchy_generation = 0
+        # bumped at every screen change, the views cache their info for one frame
+        self.frame = 0
+        self._snapshot_mode = 0
+
+    def _rpc(self, method):
+        return measure(self.rpc_stats, method)
 
     def _get_current_app(self):
         try:
-            return self.deviceV2.app_current()["package"]
+            with self._rpc("app_current"):
+                self.foreground_app = self.deviceV2.app_current()["package"]
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
+        self.foreground_app_checked_at = monotonic()
+        return self.foreground_app
+
+    def screen_changed(self):
+        """something we did may have changed the screen, or even the app on it"""
+        self.foreground_app_checked_at = 0.0
+        self._hierarchy = None
+        self.frame += 1
+
+    def hierarchy(self) -> Hierarchy:
+        """the last dump of the screen, it's taken again only after a screen change"""
+        if self._hierarchy is None:
+            try:
+                with self._rpc("dump_hierarchy"):
+                    xml_dump = self.deviceV2.dump_hierarchy()
+            except uiautomator2.JSONRPCError as e:
+                raise DeviceFacade.JsonRpcError(e)
+            self._hierarchy_generation += 1
+            self._hierarchy = Hierarchy(xml_dump, self._hierarchy_generation)
+        return self._hierarchy
+
+    @contextmanager
+    def snapshot(self):
+        """the finds in this block are resolved on a single dump of the screen"""
+        self._snapshot_mode += 1
+        try:
+            yield self
+        finally:
+            self._snapshot_mode -= 1
 
     def _ig_is_opened(self) -> bool:
-        return self._get_current_app() == self.app_id
+        if monotonic() - self.foreground_app_checked_at > FOREGROUND_APP_TTL:
+            self._get_current_app()
+        return self.foreground_app == self.app_id
 
-    def check_if_ig_is_opened(func):
-        def wrapper(self, **kwargs):
-            avoid_lst = ["choose_cloned_app", "check_if_crash_popup_is_there"]
-            caller = stack()[1].function
-            if not self._ig_is_opened() and caller not in avoid_lst:
-                raise DeviceFacade.AppHasCrashed("App has crashed / has been closed!")
-            return func(self, **kwargs)
-
-        return wrapper
-
-    @check_if_ig_is_opened
     def find(
         self,
         index=None,
+        check_app=True,
+        snapshot=None,
         **kwargs,
     ):
+        """
+        check_app=False for the popups that are shown when Instagram isn't opened
+        snapshot=True to read the view from a dump of the screen, the default is
+        True inside a `with device.snapshot()` block
+        """
+        if check_app and not self._ig_is_opened():
+            raise DeviceFacade.AppHasCrashed("App has crashed / has been closed!")
+        if snapshot is None:
+            snapshot = self._snapshot_mode > 0
+        if snapshot and Hierarchy.supports(kwargs):
+
+            def resolve(hierarchy):
+                nodes = hierarchy.find(kwargs)
+                if index is not None and len(nodes) > 1:
+                    return nodes[index : index + 1 or None]
+                return nodes
+
+            def live(view):
+                nodes = view._nodes()
+                if index is not None and len(nodes) > 1:
+                    return self.deviceV2(**kwargs)[index % len(nodes)]
+                return self.deviceV2(**kwargs)
+
+            return DeviceFacade.SnapshotView(
+                self, resolve, live, selector_key(kwargs, index)
+            )
         try:
             view = self.deviceV2(**kwargs)
-            if index is not None and view.count > 1:
-                view = self.deviceV2(**kwargs)[index]
+            if index is not None:
+                with self._rpc("count"):
+                    count = view.count
+                if count > 1:
+                    view = self.deviceV2(**kwargs)[index]
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
-        return DeviceFacade.View(view=view, device=self.deviceV2)
+        return DeviceFacade.View(
+            view=view,
+            device=self.deviceV2,
+            facade=self,
+            selector=selector_key(kwargs, index),
+        )
+
+    def wait_any(self, selectors: list, ui_timeout=Timeout.MEDIUM) -> Optional[int]:
+        """
+        Index of the first selector (the kwargs of a find) that is on the screen, None
+        if none of them shows up in time. They're all checked on the same dump, a new
+        one at every poll: a popup can appear without anything done by us.
+        The selectors a dump can't resolve are checked with exists().
+        """
+        if not self._ig_is_opened():
+            raise DeviceFacade.AppHasCrashed("App has crashed / has been closed!")
+        deadline = monotonic() + DeviceFacade.View.get_ui_timeout(ui_timeout)
+        dump = any(Hierarchy.supports(selector) for selector in selectors)
+        while True:
+            # only the dump is taken again, the views and the foreground app stay cached
+            self._hierarchy = None
+            index = self._find_on_screen(selectors, self.hierarchy() if dump else None)
+            if index is not None or monotonic() >= deadline:
+                return index
+            sleep(WAIT_ANY_POLL)
+
+    def find_any(self, selectors: list) -> Optional[int]:
+        """
+        Like wait_any without waiting: on the dump of this frame when we already have
+        it, with an exists() for each selector otherwise
+        """
+        if not self._ig_is_opened():
+            raise DeviceFacade.AppHasCrashed("App has crashed / has been closed!")
+        return self._find_on_screen(selectors, self._hierarchy)
+
+    def _find_on_screen(self, selectors: list, hierarchy) -> Optional[int]:
+        for index, selector in enumerate(selectors):
+            if hierarchy is not None and Hierarchy.supports(selector):
+                found = bool(hierarchy.find(selector))
+            else:
+                found = self.find(check_app=False, snapshot=False, **selector).exists()
+            if found:
+                return index
+        return None
 
     def back(self, modulable: bool = True):
         logger.debug("Press back button.")
-        self.deviceV2.press("back")
+        self.screen_changed()
+        with self._rpc("press"):
+            self.deviceV2.press("back")
         random_sleep(modulable=modulable)
 
-    def start_screenrecord(self, output="debug_0000.mp4", fps=20):
+    def start_screenrecord(self, output="debug_0000.mp4", fps=20, scale=1.0):
+        """
+        Keeps the last 30 seconds of the screen, written in output only if we crash.
+        scale < 1 shrinks the frames before they're kept.
+        """
         import imageio
 
+        def _pipe_scale(raw_iter):
+            import cv2
+            import numpy as np
+
+            for raw in raw_iter:
+                if scale < 1:
+                    im = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR)
+                    im = cv2.resize(
+                        im, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+                    )
+                    raw = cv2.imencode(".jpg", im)[1].tobytes()
+                yield raw
+
         def _run_MOD(self):
             from collections import deque
 
-            pipelines = [self._pipe_limit, self._pipe_convert, self._pipe_resize]
-            _iter = self._iter_minicap()
-            for p in pipelines:
-                _iter = p(_iter)
-
-            with imageio.get_writer(self._filename, fps=self._fps) as wr:
-                frames = deque(maxlen=self._fps * 30)
-                for im in _iter:
-                    frames.append(im)
-                if self.crash:
-                    for frame in frames:
-                        wr.append_data(frame)
+            # the jpegs sent by minicap, they're decoded only for the video
+            # dropped by the frame rate before scaling, only the kept ones are re-encoded
+            frames = deque(maxlen=self._fps * 30)
+            for raw in _pipe_scale(self._pipe_limit(self._iter_minicap())):
+                frames.append(raw)
+            if self.crash:
+                with imageio.get_writer(self._filename, fps=self._fps) as wr:
+                    for im in self._pipe_resize(self._pipe_convert(iter(frames))):
+                        wr.append_data(im)
             self._done_event.set()
 
         def stop_MOD(self, crash=True):
@@ -179,7 +383,7 @@ class DeviceFacade:
             debug_number = "{0:0=4d}".format(int(last_mp4[-8:-4]) + 1)
             output = f"debug_{debug_number}.mp4"
         self.deviceV2.screenrecord(output, fps)
-        logger.warning("Screen recording has been started.")
+        logger.warning(f"Screen recording has been started ({fps} fps, scale {scale}).")
 
     def stop_screenrecord(self, crash=True):
         if self.deviceV2.screenrecord.stop(crash=crash):
@@ -187,66 +391,37 @@ class DeviceFacade:
 
     def screenshot(self, path=None):
         if path is None:
-            return self.deviceV2.screenshot()
+            with self._rpc("screenshot"):
+                return self.deviceV2.screenshot()
         else:
-            self.deviceV2.screenshot(path)
+            with self._rpc("screenshot"):
+                self.deviceV2.screenshot(path)
 
     def dump_hierarchy(self, path):
-        xml_dump = self.deviceV2.dump_hierarchy()
+        with self._rpc("dump_hierarchy"):
+            xml_dump = self.deviceV2.dump_hierarchy()
         with open(path, "w", encoding="utf-8") as outfile:
             outfile.write(xml_dump)
 
     def press_power(self):
-        self.deviceV2.press("power")
+        self.screen_changed()
+        with self._rpc("press"):
+            self.deviceV2.press("power")
         sleep(2)
 
     def is_screen_locked(self):
-        data = run(
-            f"adb -s {self.deviceV2.serial} shell dumpsys window",
-            encoding="utf-8",
-            stdout=PIPE,
-            stderr=PIPE,
-            shell=True,
-        )
-        if data != "":
-            flag = search("mDreamingLockscreen=(true|false)", data.stdout)
-            return flag is not None and flag.group(1) == "true"
-        else:
-            logger.debug(
-                f"'adb -s {self.deviceV2.serial} shell dumpsys window' returns nothing!"
-            )
-            return None
+        return self.adb.dumpsys_flag("window", "mDreamingLockscreen")
 
     def _is_keyboard_show(self):
-        data = run(
-            f"adb -s {self.deviceV2.serial} shell dumpsys input_method",
-            encoding="utf-8",
-            stdout=PIPE,
-            stderr=PIPE,
-            shell=True,
-        )
-        if data != "":
-            flag = search("mInputShown=(true|false)", data.stdout)
-            return flag.group(1) == "true"
-        else:
-            logger.debug(
-                f"'adb -s {self.deviceV2.serial} shell dumpsys input_method' returns nothing!"
-            )
-            return None
+        return self.adb.dumpsys_flag("input_method", "mInputShown")
 
     def is_alive(self):
-        try:
-            return self.deviceV2._is_alive()  # deprecated method
-        except AttributeError:
-            return self.deviceV2.server.alive
+        return self.connection.is_alive()
 
     def wake_up(self):
         """Make sure agent is alive or bring it back up before starting."""
         if self.deviceV2 is not None:
-            attempts = 0
-            while not self.is_alive() and attempts < 5:
-                self.get_info()
-                attempts += 1
+            self.connection.heal()
 
     def unlock(self):
         self.swipe(Direction.UP, 0.8)
@@ -289,8 +464,10 @@ class DeviceFacade:
 
         logger.debug(f"Swipe {swipe_dir}, scale={scale}")
 
+        self.screen_changed()
         try:
-            self.deviceV2.swipe_ext(swipe_dir, scale=scale)
+            with self._rpc("swipe"):
+                self.deviceV2.swipe_ext(swipe_dir, scale=scale)
             DeviceFacade.sleep_mode(SleepTime.TINY)
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
@@ -302,9 +479,11 @@ class DeviceFacade:
         if random_y:
             ey = int(ey * uniform(0.98, 1.02))
         sy = int(sy)
+        self.screen_changed()
         try:
             logger.debug(f"Swipe from: ({sx},{sy}) to ({ex},{ey}).")
-            self.deviceV2.swipe_points([[sx, sy], [ex, ey]], uniform(0.2, 0.5))
+            with self._rpc("swipe"):
+                self.deviceV2.swipe_points([[sx, sy], [ex, ey]], uniform(0.2, 0.5))
             DeviceFacade.sleep_mode(SleepTime.TINY)
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
@@ -314,7 +493,8 @@ class DeviceFacade:
         # 'displaySizeDpY': 731, 'displayWidth': 1080, 'productName': 'OnePlus5', '
         #  screenOn': True, 'sdkInt': 27, 'naturalOrientation': True}
         try:
-            return self.deviceV2.info
+            with self._rpc("device_info"):
+                return self.deviceV2.info
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
 
@@ -333,16 +513,65 @@ class DeviceFacade:
     class View:
         deviceV2 = None  # uiautomator2
         viewV2 = None  # uiautomator2
+        facade = None  # DeviceFacade
+        _info = None
+        _info_frame = None
 
-        def __init__(self, view, device):
+        def __init__(self, view, device, facade=None, selector=None):
             self.viewV2 = view
             self.deviceV2 = device
+            self.facade = facade
+            # None when we can't name it, e.g. the items of a list
+            self.selector = selector
+
+        def _rpc(self, method):
+            rpc_stats = None if self.facade is None else self.facade.rpc_stats
+            return measure(rpc_stats, method, self.selector)
+
+        def _child_selector(self, relation, kwargs):
+            if self.selector is None:
+                return None
+            return f"{self.selector} {relation} {selector_key(kwargs)}"
+
+        def _timeout(self, ui_timeout) -> float:
+            timeout = self.get_ui_timeout(ui_timeout)
+            if self.facade is None or self.facade.ui_timeouts is None:
+                return timeout
+            return self.facade.ui_timeouts.get(self.selector, timeout)
+
+        def _record_wait(self, ui_timeout, start, found):
+            if (
+                self.facade is not None
+                and self.facade.ui_timeouts is not None
+                and self.get_ui_timeout(ui_timeout)
+            ):
+                self.facade.ui_timeouts.record(
+                    self.selector, monotonic() - start, found
+                )
+
+        def _touched(self):
+            if self.facade is not None:
+                self.facade.screen_changed()
+
+        def _get_info(self) -> dict:
+            """viewV2.info, asked once per frame: taps, swipes, typing and back start a new one"""
+            frame = None if self.facade is None else self.facade.frame
+            if self._info is None or frame is None or frame != self._info_frame:
+                try:
+                    with self._rpc("info"):
+                        self._info = self.viewV2.info
+                except uiautomator2.JSONRPCError as e:
+                    raise DeviceFacade.JsonRpcError(e)
+                self._info_frame = frame
+            return self._info
 
         def __iter__(self):
             children = []
             try:
                 children.extend(
-                    DeviceFacade.View(view=item, device=self.deviceV2)
+                    DeviceFacade.View(
+                        view=item, device=self.deviceV2, facade=self.facade
+                    )
                     for item in self.viewV2
                 )
                 return iter(children)
@@ -350,62 +579,76 @@ class DeviceFacade:
                 raise DeviceFacade.JsonRpcError(e)
 
         def ui_info(self):
-            try:
-                return self.viewV2.info
-            except uiautomator2.JSONRPCError as e:
-                raise DeviceFacade.JsonRpcError(e)
+            return self._get_info()
 
         def get_desc(self):
-            try:
-                return self.viewV2.info["contentDescription"]
-            except uiautomator2.JSONRPCError as e:
-                raise DeviceFacade.JsonRpcError(e)
+            return self._get_info()["contentDescription"]
 
         def child(self, *args, **kwargs):
             try:
                 view = self.viewV2.child(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(
+                view=view,
+                device=self.deviceV2,
+                facade=self.facade,
+                selector=None if args else self._child_selector(">", kwargs),
+            )
 
         def sibling(self, *args, **kwargs):
             try:
                 view = self.viewV2.sibling(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(
+                view=view,
+                device=self.deviceV2,
+                facade=self.facade,
+                selector=None if args else self._child_selector("~", kwargs),
+            )
 
         def left(self, *args, **kwargs):
             try:
                 view = self.viewV2.left(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(
+                view=view, device=self.deviceV2, facade=self.facade
+            )
 
         def right(self, *args, **kwargs):
             try:
                 view = self.viewV2.right(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(
+                view=view, device=self.deviceV2, facade=self.facade
+            )
 
         def up(self, *args, **kwargs):
             try:
                 view = self.viewV2.up(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(
+                view=view, device=self.deviceV2, facade=self.facade
+            )
 
         def down(self, *args, **kwargs):
             try:
                 view = self.viewV2.down(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(
+                view=view, device=self.deviceV2, facade=self.facade
+            )
 
         def click_gone(self, maxretry=3, interval=1.0):
+            self._touched()
             try:
-                self.viewV2.click_gone(maxretry, interval)
+                with self._rpc("click"):
+                    self.viewV2.click_gone(maxretry, interval)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
@@ -447,7 +690,9 @@ class DeviceFacade:
             elif mode == Location.CUSTOM:
                 try:
                     logger.debug(f"Single click ({coord[0]},{coord[1]})")
-                    self.deviceV2.click(coord[0], coord[1])
+                    with self._rpc("click"):
+                        self.deviceV2.click(coord[0], coord[1])
+                    self._touched()
                     DeviceFacade.sleep_mode(sleep)
                     return
                 except uiautomator2.JSONRPCError as e:
@@ -474,10 +719,12 @@ class DeviceFacade:
                 logger.debug(
                     f"Single click in ({x_abs},{y_abs}). Surface: ({visible_bounds['left']}-{visible_bounds['right']},{visible_bounds['top']}-{visible_bounds['bottom']})"
                 )
-                self.viewV2.click(
-                    self.get_ui_timeout(Timeout.LONG),
-                    offset=(x_offset, y_offset),
-                )
+                with self._rpc("click"):
+                    self.viewV2.click(
+                        self.get_ui_timeout(Timeout.LONG),
+                        offset=(x_offset, y_offset),
+                    )
+                self._touched()
                 DeviceFacade.sleep_mode(sleep)
 
             except uiautomator2.JSONRPCError as e:
@@ -531,33 +778,39 @@ class DeviceFacade:
             )
 
             time_between_clicks = uniform(0.050, 0.140)
+            self._touched()
 
             try:
                 logger.debug(
                     f"Double click in ({random_x},{random_y}) with t={int(time_between_clicks*1000)}ms. Surface: ({visible_bounds['left']}-{visible_bounds['right']},{visible_bounds['top']}-{visible_bounds['bottom']})."
                 )
-                self.deviceV2.double_click(
-                    random_x, random_y, duration=time_between_clicks
-                )
+                with self._rpc("click"):
+                    self.deviceV2.double_click(
+                        random_x, random_y, duration=time_between_clicks
+                    )
                 DeviceFacade.sleep_mode(SleepTime.DEFAULT)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
         def scroll(self, direction):
+            self._touched()
             try:
-                if direction == Direction.UP:
-                    self.viewV2.scroll.toBeginning(max_swipes=1)
-                else:
-                    self.viewV2.scroll.toEnd(max_swipes=1)
+                with self._rpc("scroll"):
+                    if direction == Direction.UP:
+                        self.viewV2.scroll.toBeginning(max_swipes=1)
+                    else:
+                        self.viewV2.scroll.toEnd(max_swipes=1)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
         def fling(self, direction):
+            self._touched()
             try:
-                if direction == Direction.UP:
-                    self.viewV2.fling.toBeginning(max_swipes=5)
-                else:
-                    self.viewV2.fling.toEnd(max_swipes=5)
+                with self._rpc("scroll"):
+                    if direction == Direction.UP:
+                        self.viewV2.fling.toBeginning(max_swipes=5)
+                    else:
+                        self.viewV2.fling.toEnd(max_swipes=5)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
@@ -569,7 +822,12 @@ class DeviceFacade:
                 # We will open a ticket to uiautomator2 to fix this inconsistency.
                 if self.viewV2 is None:
                     return False
-                exists: bool = self.viewV2.exists(self.get_ui_timeout(ui_timeout))
+                if ui_timeout is not None:
+                    self._info = None
+                start = monotonic()
+                with self._rpc("exists"):
+                    exists: bool = self.viewV2.exists(self._timeout(ui_timeout))
+                self._record_wait(ui_timeout, start, exists)
                 if (
                     hasattr(self.viewV2, "count")
                     and not exists
@@ -588,38 +846,43 @@ class DeviceFacade:
 
         def count_items(self) -> int:
             try:
-                return self.viewV2.count
+                with self._rpc("count"):
+                    return self.viewV2.count
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
         def wait(self, ui_timeout=Timeout.MEDIUM):
+            self._info = None
             try:
-                return self.viewV2.wait(timeout=self.get_ui_timeout(ui_timeout))
+                start = monotonic()
+                with self._rpc("exists"):
+                    found = self.viewV2.wait(timeout=self._timeout(ui_timeout))
+                self._record_wait(ui_timeout, start, found)
+                return found
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
         def wait_gone(self, ui_timeout=None):
+            self._info = None
             try:
-                return self.viewV2.wait_gone(timeout=self.get_ui_timeout(ui_timeout))
+                with self._rpc("wait_gone"):
+                    return self.viewV2.wait_gone(
+                        timeout=self.get_ui_timeout(ui_timeout)
+                    )
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
         def is_above_this(self, obj2) -> Optional[bool]:
-            obj1 = self.viewV2
-            obj2 = obj2.viewV2
             try:
-                if obj1.exists() and obj2.exists():
-                    return obj1.info["bounds"]["top"] < obj2.info["bounds"]["top"]
-                else:
+                return self.get_bounds()["top"] < obj2.get_bounds()["top"]
+            except DeviceFacade.JsonRpcError as e:
+                # one of them isn't on the screen
+                if isinstance(e.args[0], uiautomator2.UiObjectNotFoundError):
                     return None
-            except uiautomator2.JSONRPCError as e:
-                raise DeviceFacade.JsonRpcError(e)
+                raise
 
         def get_bounds(self) -> dict:
-            try:
-                return self.viewV2.info["bounds"]
-            except uiautomator2.JSONRPCError as e:
-                raise DeviceFacade.JsonRpcError(e)
+            return self._get_info()["bounds"]
 
         def get_height(self) -> int:
             bounds = self.get_bounds()
@@ -630,15 +893,12 @@ class DeviceFacade:
             return bounds["right"] - bounds["left"]
 
         def get_property(self, prop: str):
-            try:
-                return self.viewV2.info[prop]
-            except uiautomator2.JSONRPCError as e:
-                raise DeviceFacade.JsonRpcError(e)
+            return self._get_info()[prop]
 
         def is_scrollable(self):
             try:
                 if self.viewV2.exists():
-                    return self.viewV2.info["scrollable"]
+                    return self._get_info()["scrollable"]
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
@@ -660,7 +920,7 @@ class DeviceFacade:
         def get_text(self, error=True, index=None):
             try:
                 text = (
-                    self.viewV2.info["text"]
+                    self._get_info()["text"]
                     if index is None
                     else self.viewV2[index].info["text"]
                 )
@@ -677,7 +937,7 @@ class DeviceFacade:
         def get_selected(self) -> bool:
             try:
                 if self.viewV2.exists():
-                    return self.viewV2.info["selected"]
+                    return self._get_info()["selected"]
                 logger.debug(
                     "Object has disappeared! Probably too short video which has been liked!"
                 )
@@ -686,42 +946,22 @@ class DeviceFacade:
                 raise DeviceFacade.JsonRpcError(e)
 
         def set_text(self, text: str, mode: Mode = Mode.TYPE) -> None:
-            punct_list = string.punctuation
             try:
                 if mode == Mode.PASTE:
                     self.viewV2.set_text(text)
                 else:
                     self.click(sleep=SleepTime.SHORT)
-                    self.deviceV2.clear_text()
+                    with self._rpc("send_keys"):
+                        self.deviceV2.clear_text()
                     random_sleep(0.3, 1, modulable=False)
                     start = datetime.now()
-                    sentences = text.splitlines()
-                    for j, sentence in enumerate(sentences, start=1):
-                        word_list = sentence.split()
-                        n_words = len(word_list)
-                        for n, word in enumerate(word_list, start=1):
-                            i = 0
-                            n_single_letters = randint(1, 3)
-                            for char in word:
-                                if i < n_single_letters:
-                                    self.deviceV2.send_keys(char, clear=False)
-                                    # random_sleep(0.01, 0.1, modulable=False, logging=False)
-                                    i += 1
-                                else:
-                                    if word[-1] in punct_list:
-                                        self.deviceV2.send_keys(word[i:-1], clear=False)
-                                        # random_sleep(0.01, 0.1, modulable=False, logging=False)
-                                        self.deviceV2.send_keys(word[-1], clear=False)
-                                    else:
-                                        self.deviceV2.send_keys(word[i:], clear=False)
-                                    # random_sleep(0.01, 0.1, modulable=False, logging=False)
-                                    break
-                            if n < n_words:
-                                self.deviceV2.send_keys(" ", clear=False)
-                                # random_sleep(0.01, 0.1, modulable=False, logging=False)
-                        if j < len(sentences):
-                            self.deviceV2.send_keys("\n")
-
+                    try:
+                        with self._rpc("send_keys"):
+                            self.deviceV2.wait_fastinput_ime()
+                            # the keyboard gets the chunks one by one, in a single request
+                            self.deviceV2.shell(typing_script(plan_typing(text)))
+                    except EnvironmentError as e:
+                        logger.debug(f"FastInputIME isn't ready: {e}")
                     typed_text = self.viewV2.get_text()
                     if typed_text != text:
                         logger.warning(
@@ -732,10 +972,119 @@ class DeviceFacade:
                         logger.debug(
                             f"Text typed in: {(datetime.now()-start).total_seconds():.2f}s"
                         )
+                self._touched()
                 DeviceFacade.sleep_mode(SleepTime.SHORT)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+    class SnapshotView(View):
+        """
+        A View read from DeviceFacade.hierarchy() instead of one RPC per property.
+        The nodes are resolved again on the next dump when the screen changes, the
+        actions and the waits for something not in the dump use the live view.
+        """
+
+        def __init__(self, facade, resolve, live, selector=None):
+            self.facade = facade
+            self.deviceV2 = facade.deviceV2
+            self.selector = selector
+            self._resolve = resolve
+            self._live = live
+            self._live_view = None
+            self._generation = None
+            self._matches = []
+
+        @property
+        def viewV2(self):
+            # the uiautomator2 selector is built only if we really need it
+            if self._live_view is None:
+                self._live_view = self._live(self)
+            return self._live_view
+
+        def _nodes(self) -> list:
+            hierarchy = self.facade.hierarchy()
+            if self._generation != hierarchy.generation:
+                self._matches = self._resolve(hierarchy)
+                self._generation = hierarchy.generation
+            return self._matches
+
+        def _node(self):
+            nodes = self._nodes()
+            return nodes[0] if nodes else None
+
+        def __iter__(self):
+            return iter(
+                [
+                    DeviceFacade.SnapshotView(
+                        self.facade,
+                        lambda hierarchy, n=n: self._nodes()[n : n + 1],
+                        lambda view, n=n: self.viewV2[n],
+                    )
+                    for n in range(len(self._nodes()))
+                ]
+            )
+
+        def child(self, *args, **kwargs):
+            if args or not Hierarchy.supports(kwargs):
+                return super().child(*args, **kwargs)
+
+            def resolve(hierarchy):
+                parent = self._node()
+                return [] if parent is None else hierarchy.find(kwargs, parent)
+
+            return DeviceFacade.SnapshotView(
+                self.facade,
+                resolve,
+                lambda view: self.viewV2.child(**kwargs),
+                self._child_selector(">", kwargs),
+            )
+
+        def _get_info(self) -> dict:
+            node = self._node()
+            return super()._get_info() if node is None else node_info(node)
+
+        def get_selected(self) -> bool:
+            if self._node() is None:
+                return super().get_selected()
+            return self._get_info()["selected"]
+
+        def is_scrollable(self):
+            if self._node() is None:
+                return super().is_scrollable()
+            return self._get_info()["scrollable"]
+
+        def get_text(self, error=True, index=None):
+            nodes = self._nodes()
+            n = 0 if index is None else index
+            if not -len(nodes) <= n < len(nodes):
+                return super().get_text(error, index)
+            text = nodes[n].get("text")
+            if not text:
+                logger.debug("Object exists but doesn't contain any text.")
+            return text or ""
+
+        def count_items(self) -> int:
+            return len(self._nodes())
+
+        def exists(self, ui_timeout=None, ignore_bug: bool = False) -> bool:
+            if self._node() is not None:
+                return True
+            if self.get_ui_timeout(ui_timeout) == 0:
+                return False
+            # it wasn't there when we took the dump, wait for it on the device
+            exists = super().exists(ui_timeout, ignore_bug)
+            if exists:
+                self.facade.screen_changed()
+            return exists
+
+        def wait(self, ui_timeout=Timeout.MEDIUM):
+            return self.exists(ui_timeout)
+
+        def is_above_this(self, obj2) -> Optional[bool]:
+            if not self.exists():
+                return None
+            return super().is_above_this(obj2)
+
     class JsonRpcError(Exception):
         pass
 
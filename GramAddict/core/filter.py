@@ -585,43 +585,53 @@ class Filter:
         profile_picture = device.find(
             resourceIdMatches=ResourceID.PROFILE_HEADER_AVATAR_CONTAINER_TOP_LEFT_STUB
         )
-        restricted_profile = device.find(
-            resourceIdMatches=ResourceID.RESTRICTED_ACCOUNT_TITLE
-        )
         is_restricted = False
-        if not profile_picture.exists(Timeout.LONG):
-            if restricted_profile.exists():
-                is_restricted = True
+        loaded = device.wait_any(
+            [
+                dict(
+                    resourceIdMatches=ResourceID.PROFILE_HEADER_AVATAR_CONTAINER_TOP_LEFT_STUB
+                ),
+                dict(resourceIdMatches=ResourceID.RESTRICTED_ACCOUNT_TITLE),
+            ],
+            Timeout.LONG,
+        )
+        if loaded == 1:
+            is_restricted = True
+        elif loaded is None:
+            logger.warning(
+                "Looks like this profile hasn't loaded yet! Wait a little bit more.."
+            )
+            if profile_picture.exists(Timeout.LONG):
+                logger.info("Profile loaded!")
             else:
                 logger.warning(
-                    "Looks like this profile hasn't loaded yet! Wait a little bit more.."
+                    "Profile not fully loaded after 16s. Is your connection ok? Let's sleep for 1-2 minutes."
                 )
-                if profile_picture.exists(Timeout.LONG):
-                    logger.info("Profile loaded!")
-                else:
+                random_sleep(60, 120, modulable=False)
+                if profile_picture.exists():
                     logger.warning(
-                        "Profile not fully loaded after 16s. Is your connection ok? Let's sleep for 1-2 minutes."
+                        "Profile won't load! Maybe you're soft-banned or you've lost your connection!"
                     )
-                    random_sleep(60, 120, modulable=False)
-                    if profile_picture.exists():
-                        logger.warning(
-                            "Profile won't load! Maybe you're soft-banned or you've lost your connection!"
-                        )
         profileView = ProfileView(device)
         if not is_restricted:
-            profile = Profile(
-                mutual_friends=self._get_mutual_friends(device, profileView),
-                follow_button_text=self._get_follow_button_text(device, profileView),
-                is_restricted=is_restricted,
-                is_private=self._is_private_account(device, profileView),
-                has_business_category=self._has_business_category(device, profileView),
-                posts_count=self._get_posts_count(device, profileView),
-                biography=self._get_profile_biography(device, profileView),
-                link_in_bio=self._get_link_in_bio(device, profileView),
-                fullname=self._get_fullname(device, profileView),
-            )
-            followers, following = self._get_followers_and_followings(device)
-            profile.set_followers_and_following(followers, following)
+            with device.snapshot():
+                profile = Profile(
+                    mutual_friends=self._get_mutual_friends(device, profileView),
+                    follow_button_text=self._get_follow_button_text(
+                        device, profileView
+                    ),
+                    is_restricted=is_restricted,
+                    is_private=self._is_private_account(device, profileView),
+                    has_business_category=self._has_business_category(
+                        device, profileView
+                    ),
+                    posts_count=self._get_posts_count(device, profileView),
+                    biography=self._get_profile_biography(device, profileView),
+                    link_in_bio=self._get_link_in_bio(device, profileView),
+                    fullname=self._get_fullname(device, profileView),
+                )
+                followers, following = self._get_followers_and_followings(device)
+                profile.set_followers_and_following(followers, following)
         else:
             profile = Profile(
                 mutual_friends=None,
@@ -89,6 +89,70 @@ def interact(
     )
 
 
+def is_seen_by_other_accounts(self, storage, username) -> bool:
+    if self.args.shared_storage is None:
+        return False
+    seen = storage.check_user_was_seen_by_other_accounts(
+        username, get_value(self.args.shared_storage, None, 24)
+    )
+    if seen is None:
+        return False
+    account, skip_reason = seen
+    if skip_reason is None:
+        logger.info(f"@{username}: recently interacted by @{account}. Skip.")
+    else:
+        logger.info(
+            f"@{username}: recently rejected by @{account}'s filters ({skip_reason}). Skip."
+        )
+    return True
+
+
+# a resumed list is never moved down more than this
+RESUME_MAX_STEPS = 50
+
+
+def resume_list(self, storage, current_job, target, move, is_visible=None):
+    """
+    move where the previous run stopped, the rows in between aren't read at all.
+    The steps are approximate (a fling is one step, lists shrink while unfollowing):
+    is_visible(username) stops us at the last user seen by that run, and we never
+    skip more than RESUME_MAX_STEPS
+    """
+    if not self.args.resume_lists:
+        return
+    cursor = storage.list_cursors.get(current_job, target)
+    if cursor is None:
+        return
+    steps = min(cursor["scrolls"], RESUME_MAX_STEPS)
+    anchor = cursor["username"] if is_visible is not None else None
+    logger.info(
+        f"Resuming {target} where we left it{'' if cursor['username'] is None else ' (after @' + cursor['username'] + ')'}, up to {steps} step(s) down.",
+        extra={"color": f"{Fore.GREEN}"},
+    )
+    moved = 0
+    while moved < steps:
+        if anchor is not None and is_visible(anchor):
+            logger.debug(f"@{anchor} is on the screen, resuming from here.")
+            break
+        move()
+        moved += 1
+    # the next steps are counted from where we really are
+    storage.list_cursors.set(current_job, target, moved, cursor["username"])
+
+
+def remember_list_position(self, storage, current_job, target, usernames=()):
+    """we moved one step down, usernames are the ones seen before moving"""
+    if self.args.resume_lists:
+        storage.list_cursors.advance(
+            current_job, target, usernames[-1] if usernames else None
+        )
+
+
+def forget_list_position(self, storage, current_job, target):
+    if self.args.resume_lists:
+        storage.list_cursors.reset(current_job, target)
+
+
 def handle_blogger(
     self,
     device,
@@ -203,6 +267,8 @@ def handle_blogger_from_file(
                 else:
                     if storage.is_user_in_blacklist(username):
                         logger.info(f"@{username} is in blacklist. Skip.")
+                    elif is_seen_by_other_accounts(self, storage, username):
+                        pass
                     else:
                         (
                             interacted,
@@ -304,6 +370,14 @@ def handle_likers(
         and not nav_to_hashtag_or_place(device, target, current_job)
     ):
         return False
+    # here the steps are the posts already done
+    resume_list(
+        self,
+        storage,
+        current_job,
+        target,
+        lambda: PostsViewList(device).swipe_to_fit_posts(SwipeTo.NEXT_POST),
+    )
     post_description = ""
     nr_same_post = 0
     nr_same_posts_max = 3
@@ -320,6 +394,7 @@ def handle_likers(
                     f"Scrolled through {nr_same_posts_max} posts with same description and author. Finish.",
                     extra={"color": f"{Fore.CYAN}"},
                 )
+                forget_list_position(self, storage, current_job, target)
                 break
         else:
             nr_same_post = 0
@@ -332,6 +407,7 @@ def handle_likers(
             PostsViewList(device).open_likers_container()
         else:
             PostsViewList(device).swipe_to_fit_posts(SwipeTo.NEXT_POST)
+            remember_list_position(self, storage, current_job, target)
             continue
 
         posts_end_detector.notify_new_page()
@@ -370,6 +446,8 @@ def handle_likers(
                     can_interact = False
                     if storage.is_user_in_blacklist(username):
                         logger.info(f"@{username} is in blacklist. Skip.")
+                    elif is_seen_by_other_accounts(self, storage, username):
+                        pass
                     else:
                         (
                             interacted,
@@ -435,6 +513,9 @@ def handle_likers(
                 device.back()
                 logger.info("Going to the next post.")
                 PostsViewList(device).swipe_to_fit_posts(SwipeTo.NEXT_POST)
+                remember_list_position(
+                    self, storage, current_job, target, prev_screen_iterated_likers
+                )
                 break
             if posts_end_detector.is_fling_limit_reached():
                 logger.info(
@@ -454,6 +535,9 @@ def handle_likers(
             if posts_end_detector.is_the_end():
                 device.back()
                 PostsViewList(device).swipe_to_fit_posts(SwipeTo.NEXT_POST)
+                remember_list_position(
+                    self, storage, current_job, target, prev_screen_iterated_likers
+                )
                 break
             if not opened:
                 logger.info(
@@ -714,6 +798,18 @@ def iterate_over_followers(
         )
         return row_search.exists()
 
+    if not is_myself:
+        resume_list(
+            self,
+            storage,
+            current_job,
+            target,
+            lambda: device.find(
+                resourceId=self.ResourceID.LIST, className=ClassName.LIST_VIEW
+            ).scroll(Direction.DOWN),
+            lambda username: device.find(text=username, snapshot=True).exists(),
+        )
+
     while True:
         logger.info("Iterate over visible followers.")
         screen_iterated_followers = []
@@ -744,6 +840,8 @@ def iterate_over_followers(
                 can_interact = False
                 if storage.is_user_in_blacklist(username):
                     logger.info(f"@{username} is in blacklist. Skip.")
+                elif is_seen_by_other_accounts(self, storage, username):
+                    screen_skipped_followers_count += 1
                 else:
                     interacted, interacted_when = storage.check_user_was_interacted(
                         username
@@ -802,6 +900,7 @@ def iterate_over_followers(
             load_more_button_exists = load_more_button.exists()
 
             if scroll_end_detector.is_the_end():
+                forget_list_position(self, storage, current_job, target)
                 return
 
             need_swipe = screen_skipped_followers_count == len(
@@ -858,9 +957,14 @@ def iterate_over_followers(
                 else:
                     logger.info("Need to scroll now", extra={"color": f"{Fore.GREEN}"})
                     list_view.scroll(Direction.DOWN)
+            if not is_myself:
+                remember_list_position(
+                    self, storage, current_job, target, screen_iterated_followers
+                )
         else:
             logger.info(
                 "No followers were iterated, finish.",
                 extra={"color": f"{Fore.GREEN}"},
             )
+            forget_list_position(self, storage, current_job, target)
             return
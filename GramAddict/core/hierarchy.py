@@ -0,0 +1,113 @@
+import re
+
+from lxml import etree  # already required by uiautomator2
+
+# uiautomator2 selector -> (xml attribute, how the value is compared)
+SELECTORS = {
+    "text": ("text", "equals"),
+    "textContains": ("text", "contains"),
+    "textMatches": ("text", "matches"),
+    "textStartsWith": ("text", "startswith"),
+    "className": ("class", "equals"),
+    "classNameMatches": ("class", "matches"),
+    "description": ("content-desc", "equals"),
+    "descriptionContains": ("content-desc", "contains"),
+    "descriptionMatches": ("content-desc", "matches"),
+    "descriptionStartsWith": ("content-desc", "startswith"),
+    "packageName": ("package", "equals"),
+    "packageNameMatches": ("package", "matches"),
+    "resourceId": ("resource-id", "equals"),
+    "resourceIdMatches": ("resource-id", "matches"),
+    "index": ("index", "equals"),
+    "checkable": ("checkable", "equals"),
+    "checked": ("checked", "equals"),
+    "clickable": ("clickable", "equals"),
+    "longClickable": ("long-clickable", "equals"),
+    "scrollable": ("scrollable", "equals"),
+    "enabled": ("enabled", "equals"),
+    "focusable": ("focusable", "equals"),
+    "focused": ("focused", "equals"),
+    "selected": ("selected", "equals"),
+}
+BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+def _to_attribute(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _compare(how, attribute, value) -> bool:
+    if how == "equals":
+        return attribute == value
+    if how == "contains":
+        return value in attribute
+    if how == "startswith":
+        return attribute.startswith(value)
+    # uiautomator uses java's Pattern.matches(), the whole string has to match
+    return re.fullmatch(value, attribute, re.DOTALL) is not None
+
+
+def parse_bounds(bounds: str) -> dict:
+    match = BOUNDS_RE.match(bounds or "")
+    if match is None:
+        return {"left": 0, "top": 0, "right": 0, "bottom": 0}
+    left, top, right, bottom = (int(value) for value in match.groups())
+    return {"left": left, "top": top, "right": right, "bottom": bottom}
+
+
+def node_info(node) -> dict:
+    """the same dict returned by uiautomator2 for UiObject.info"""
+    attributes = node.attrib
+    bounds = parse_bounds(attributes.get("bounds"))
+    return {
+        "bounds": bounds,
+        "checkable": attributes.get("checkable") == "true",
+        "checked": attributes.get("checked") == "true",
+        "childCount": len(node),
+        "className": attributes.get("class"),
+        "clickable": attributes.get("clickable") == "true",
+        "contentDescription": attributes.get("content-desc"),
+        "enabled": attributes.get("enabled") == "true",
+        "focusable": attributes.get("focusable") == "true",
+        "focused": attributes.get("focused") == "true",
+        "longClickable": attributes.get("long-clickable") == "true",
+        "packageName": attributes.get("package"),
+        "resourceName": attributes.get("resource-id") or None,
+        "scrollable": attributes.get("scrollable") == "true",
+        "selected": attributes.get("selected") == "true",
+        "text": attributes.get("text"),
+        "visibleBounds": bounds,
+    }
+
+
+class Hierarchy:
+    """One dump_hierarchy() of the screen, the selectors are evaluated on it locally"""
+
+    def __init__(self, xml: str, generation: int):
+        parser = etree.XMLParser(recover=True, huge_tree=True)
+        self.root = etree.fromstring(xml.encode("utf-8"), parser)
+        # bumped at every dump, views know when their nodes are stale
+        self.generation = generation
+
+    @staticmethod
+    def supports(selector: dict) -> bool:
+        return all(key in SELECTORS for key in selector)
+
+    @staticmethod
+    def matches(node, selector: dict) -> bool:
+        for key, value in selector.items():
+            attribute, how = SELECTORS[key]
+            if not _compare(how, node.get(attribute, ""), _to_attribute(value)):
+                return False
+        return True
+
+    def find(self, selector: dict, parent=None) -> list:
+        """nodes matching the selector in document order, like the uiautomator instances"""
+        scope = self.root if parent is None else parent
+        return [
+            node
+            for node in scope.iterdescendants("node")
+            if self.matches(node, selector)
+        ]
@@ -10,6 +10,39 @@ from GramAddict.core.storage import ACCOUNTS
 logger = logging.getLogger(__name__)
 
 
+def read_persistent_list(directory, filename):
+    """
+    items saved by PersistentList, the last record of each id wins
+    falls back to the old json format, None if nothing has been saved yet
+    """
+    path = f"{ACCOUNTS}/{directory}/{filename}.jsonl"
+    if os.path.exists(path):
+        items = {}
+        with open(path, encoding="utf-8") as jsonl_file:
+            for line in jsonl_file:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # a hard kill while appending leaves a truncated line
+                    logger.debug(f"Skipping corrupted line in {jsonl_file.name}.")
+                    continue
+                items[item["id"]] = item
+        return list(items.values())
+    try:
+        with open(f"{ACCOUNTS}/{directory}/{filename}.json") as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return None
+
+
+def append_persistent_items(directory, filename, items):
+    """append json items to a PersistentList file, e.g. a session recovered after a crash"""
+    PersistentList._append_lines(
+        f"{ACCOUNTS}/{directory}/{filename}.jsonl",
+        [json.dumps(item, sort_keys=False) for item in items],
+    )
+
+
 class PersistentList(list):
     filename = None
     encoder = None
@@ -17,40 +50,65 @@ class PersistentList(list):
     def __init__(self, filename, encoder):
         self.filename = filename
         self.encoder = encoder
+        # last line written for every id, unchanged items aren't appended again
+        self.persisted = {}
         super().__init__()
 
     def persist(self, directory):
+        """append a line for every new or changed item, the file is never read or rewritten"""
         if directory is None:
             return
 
         if not os.path.exists(f"{ACCOUNTS}/{directory}"):
             os.makedirs(f"{ACCOUNTS}/{directory}")
 
-        path = f"{ACCOUNTS}/{directory}/{self.filename}.json"
+        path = f"{ACCOUNTS}/{directory}/{self.filename}.jsonl"
+        json_path = f"{ACCOUNTS}/{directory}/{self.filename}.json"
+        if os.path.exists(json_path):
+            self._convert_json(json_path, path)
 
-        if os.path.exists(path):
-            with open(path) as json_file:
-                try:
-                    json_array = json.load(json_file)
-                except Exception as e:
-                    logger.error(
-                        f"Please check {json_file.name}, it contains this error: {e}"
-                    )
-                    sys.exit(0)
-            os.remove(path)
-        else:
-            json_array = []
-
-        json_array += (self.encoder.default(self.encoder, item) for item in self)
-
-        # Remove duplicates
-        json_object = {}
-        for item in json_array:
-            item_id = item.get("id")
+        lines = {}
+        for item in self:
+            json_item = self.encoder.default(self.encoder, item)
+            item_id = json_item.get("id")
             if item_id is None:
                 raise Exception("Items in PersistentList must have id property!")
-            json_object[item_id] = item
-        json_array = list(json_object.values())
+            line = json.dumps(json_item, sort_keys=False)
+            if self.persisted.get(item_id) != line:
+                lines[item_id] = line
+        if not lines:
+            return
+        self._append_lines(path, list(lines.values()))
+        self.persisted.update(lines)
+
+    @staticmethod
+    def _append_lines(path, lines):
+        # don't glue the new lines to a line truncated by a crash
+        separator = ""
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as jsonl_file:
+                jsonl_file.seek(-1, os.SEEK_END)
+                if jsonl_file.read(1) != b"\n":
+                    separator = "\n"
+        with open(path, "a", encoding="utf-8") as outfile:
+            outfile.write(separator + "\n".join(lines) + "\n")
 
+    @staticmethod
+    def _convert_json(json_path, path):
+        """one-shot move of the old json array in the json lines file"""
+        with open(json_path) as json_file:
+            try:
+                json_array = json.load(json_file)
+            except Exception as e:
+                logger.error(
+                    f"Please check {json_file.name}, it contains this error: {e}"
+                )
+                sys.exit(0)
         with atomic_write(path, overwrite=True, encoding="utf-8") as outfile:
-            json.dump(json_array, outfile, indent=4, sort_keys=False)
+            for item in json_array:
+                outfile.write(json.dumps(item, sort_keys=False) + "\n")
+            # lines already there are newer than the json file
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as jsonl_file:
+                    outfile.writelines(jsonl_file)
+        os.remove(json_path)
@@ -0,0 +1,446 @@
+import json
+import logging
+import os
+import shutil
+
+import uiautomator2
+
+from GramAddict.core.hierarchy import Hierarchy, node_info
+
+logger = logging.getLogger(__name__)
+
+# one line per screen: its files, device.info, the app in foreground and the action done on it
+SCREENS = "screens.jsonl"
+# the actions of uiautomator2 that leave the screen, anything else only reads it
+DEVICE_ACTIONS = (
+    "press",
+    "click",
+    "double_click",
+    "swipe_ext",
+    "swipe_points",
+    "app_start",
+    "app_stop",
+    "app_stop_all",
+)
+OBJECT_ACTIONS = ("click", "click_gone", "long_click", "scroll", "fling")
+OBJECT_RELATIONS = ("child", "sibling", "left", "right", "up", "down")
+
+
+class ScreenRecorder:
+    """Saves the screen the bot is looking at every time it does something on it"""
+
+    def __init__(self, client, directory):
+        self.client = client
+        self.directory = directory
+        self.screens = 0
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def record(self, action, *args):
+        name = f"{self.screens:05d}"
+        xml_dump = self.client.dump_hierarchy()
+        with open(
+            os.path.join(self.directory, f"{name}.xml"), "w", encoding="utf-8"
+        ) as outfile:
+            outfile.write(xml_dump)
+        image = self.client.screenshot()
+        image.convert("RGB").save(os.path.join(self.directory, f"{name}.jpg"))
+        screen = {
+            "hierarchy": f"{name}.xml",
+            "screenshot": {
+                "file": f"{name}.jpg",
+                "width": image.width,
+                "height": image.height,
+            },
+            "info": self.client.info,
+            "app": self.client.app_current()["package"],
+            "action": {"name": action, "args": list(args)},
+        }
+        with open(
+            os.path.join(self.directory, SCREENS), "a", encoding="utf-8"
+        ) as outfile:
+            outfile.write(json.dumps(screen, default=str) + "\n")
+        self.screens += 1
+
+
+class RecordingDevice:
+    """A uiautomator2 client recording the screen before every action"""
+
+    def __init__(self, client, directory):
+        self._client = client
+        self._recorder = ScreenRecorder(client, directory)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in DEVICE_ACTIONS:
+            return _recording(self._recorder, name, attr)
+        return attr
+
+    def __call__(self, **kwargs):
+        return RecordingObject(self._client(**kwargs), self._recorder)
+
+
+class RecordingObject:
+    def __init__(self, obj, recorder):
+        self._obj = obj
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if name in ("scroll", "fling"):
+            # the swipe itself is done by the toBeginning / toEnd of what we return
+            self._recorder.record(name)
+        elif name in OBJECT_ACTIONS:
+            return _recording(self._recorder, name, attr)
+        elif name in OBJECT_RELATIONS:
+
+            def relation(*args, **kwargs):
+                obj = attr(*args, **kwargs)
+                return None if obj is None else RecordingObject(obj, self._recorder)
+
+            return relation
+        return attr
+
+    def __getitem__(self, index):
+        return RecordingObject(self._obj[index], self._recorder)
+
+    def __iter__(self):
+        return iter([RecordingObject(obj, self._recorder) for obj in self._obj])
+
+
+def _recording(recorder, name, method):
+    def action(*args, **kwargs):
+        recorder.record(name, *args)
+        return method(*args, **kwargs)
+
+    return action
+
+
+class ReplayDevice:
+    """
+    Stands in for the uiautomator2 client, the screens come from a recording.
+    The selectors are resolved on the recorded hierarchy and every action shows
+    the next screen, no waits: a whole job runs at full speed without a phone.
+    """
+
+    serial = "replay"
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, SCREENS), encoding="utf-8") as json_file:
+            self.screens = [json.loads(line) for line in json_file if line.strip()]
+        if not self.screens:
+            raise ValueError(f"{directory} doesn't contain any screen.")
+        self.position = 0
+        self.toast = _ReplayToast()
+        self._hierarchy = None
+
+    @property
+    def screen(self) -> dict:
+        return self.screens[self.position]
+
+    def hierarchy(self) -> Hierarchy:
+        if self._hierarchy is None or self._hierarchy.generation != self.position:
+            self._hierarchy = Hierarchy(self.dump_hierarchy(), self.position)
+        return self._hierarchy
+
+    def advance(self, action):
+        recorded = self.screen["action"]["name"]
+        if action != recorded:
+            logger.debug(
+                f"Replay: {action} done on screen {self.position}, it was recorded before a {recorded}."
+            )
+        if self.position + 1 < len(self.screens):
+            self.position += 1
+        else:
+            logger.warning("The recording is over, staying on its last screen.")
+
+    def __call__(self, **kwargs):
+        return ReplayObject(self, kwargs)
+
+    @property
+    def info(self) -> dict:
+        return self.screen["info"]
+
+    def dump_hierarchy(self, *args, **kwargs) -> str:
+        with open(
+            os.path.join(self.directory, self.screen["hierarchy"]), encoding="utf-8"
+        ) as xml_file:
+            return xml_file.read()
+
+    def screenshot(self, filename=None, *args, **kwargs):
+        path = os.path.join(self.directory, self.screen["screenshot"]["file"])
+        if filename is not None:
+            shutil.copyfile(path, filename)
+            return None
+        from PIL import Image
+
+        return Image.open(path)
+
+    def app_current(self) -> dict:
+        return {"package": self.screen["app"]}
+
+    def app_list_running(self) -> list:
+        return [self.screen["app"]]
+
+    def window_size(self):
+        return self.info["displayWidth"], self.info["displayHeight"]
+
+    def _get_orientation(self):
+        return self.info.get("displayRotation", 0)
+
+    def _is_alive(self) -> bool:
+        return True
+
+    def send_keys(self, *args, **kwargs):
+        # the typed text is already in the screen recorded before the next action
+        pass
+
+    def wait_fastinput_ime(self, timeout=5.0) -> bool:
+        return True
+
+    def shell(self, cmdargs, timeout=60):
+        return "", 0
+
+    def clear_text(self):
+        pass
+
+    def set_fastinput_ime(self, enable=True):
+        pass
+
+    def screen_off(self):
+        pass
+
+    def press(self, key, *args):
+        self.advance("press")
+
+    def click(self, x, y):
+        self.advance("click")
+
+    def double_click(self, x, y, duration=0.1):
+        self.advance("double_click")
+
+    def swipe_ext(self, direction, scale=0.9, *args, **kwargs):
+        self.advance("swipe_ext")
+
+    def swipe_points(self, points, duration=0.5):
+        self.advance("swipe_points")
+
+    def app_start(self, package_name, *args, **kwargs):
+        self.advance("app_start")
+
+    def app_stop(self, package_name):
+        self.advance("app_stop")
+
+    def app_stop_all(self, excludes=None):
+        self.advance("app_stop_all")
+
+
+class _ReplayToast:
+    def get_message(self, wait_timeout=10, cache_timeout=10, default=None):
+        return default
+
+
+class _ReplayScroll:
+    def __init__(self, device, action):
+        self.device = device
+        self.action = action
+
+    def toBeginning(self, *args, **kwargs):
+        self.device.advance(self.action)
+
+    def toEnd(self, *args, **kwargs):
+        self.device.advance(self.action)
+
+
+class ReplayObject:
+    """A uiautomator2 UiObject looked up in the recorded hierarchy of the current screen"""
+
+    def __init__(self, device, selector, index=None, resolve=None):
+        self.device = device
+        self.selector = selector
+        self.index = index
+        # for children and siblings: hierarchy -> the candidates nodes
+        self._resolve = resolve
+
+    def _nodes(self) -> list:
+        hierarchy = self.device.hierarchy()
+        if self._resolve is not None:
+            nodes = self._resolve(hierarchy)
+        else:
+            nodes = hierarchy.find(self.selector)
+        if self.index is None:
+            return nodes
+        return nodes[self.index : self.index + 1 or None]
+
+    def _node(self):
+        nodes = self._nodes()
+        if not nodes:
+            raise uiautomator2.UiObjectNotFoundError(
+                {"code": -32002, "data": str(self.selector), "method": "objInfo"}
+            )
+        return nodes[0]
+
+    @property
+    def count(self) -> int:
+        return len(self._nodes())
+
+    @property
+    def info(self) -> dict:
+        return node_info(self._node())
+
+    def exists(self, timeout=0) -> bool:
+        return bool(self._nodes())
+
+    def wait(self, exists=True, timeout=None) -> bool:
+        return self.exists() == exists
+
+    def wait_gone(self, timeout=None) -> bool:
+        return not self.exists()
+
+    def get_text(self, *args, **kwargs):
+        return self._node().get("text")
+
+    def set_text(self, text, *args, **kwargs):
+        pass
+
+    def click(self, *args, **kwargs):
+        self._node()
+        self.device.advance("click")
+
+    def click_gone(self, maxretry=10, interval=1.0):
+        self.click()
+        return True
+
+    @property
+    def scroll(self):
+        return _ReplayScroll(self.device, "scroll")
+
+    @property
+    def fling(self):
+        return _ReplayScroll(self.device, "fling")
+
+    def __getitem__(self, index):
+        return ReplayObject(self.device, self.selector, index, self._resolve)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(
+            [
+                ReplayObject(self.device, self.selector, index, self._resolve)
+                for index in range(self.count)
+            ]
+        )
+
+    def child(self, **kwargs):
+        def resolve(hierarchy):
+            return hierarchy.find(kwargs, self._node())
+
+        return ReplayObject(self.device, kwargs, resolve=resolve)
+
+    def sibling(self, **kwargs):
+        def resolve(hierarchy):
+            node = self._node()
+            parent = node.getparent()
+            if parent is None:
+                return []
+            return [
+                sibling
+                for sibling in hierarchy.find(kwargs, parent)
+                if sibling is not node
+            ]
+
+        return ReplayObject(self.device, kwargs, resolve=resolve)
+
+    def _beside(self, distance, kwargs):
+        """the closest view matching kwargs on that side, like uiautomator2 does"""
+        bounds = self.info["bounds"]
+        found = None
+        min_distance = -1
+        for obj in ReplayObject(self.device, kwargs):
+            dist = distance(bounds, obj.info["bounds"])
+            if dist >= 0 and (min_distance < 0 or dist < min_distance):
+                min_distance, found = dist, obj
+        return found
+
+    def left(self, **kwargs):
+        return self._beside(
+            lambda a, b: a["left"] - b["right"] if _overlap(a, b, "top") else -1,
+            kwargs,
+        )
+
+    def right(self, **kwargs):
+        return self._beside(
+            lambda a, b: b["left"] - a["right"] if _overlap(a, b, "top") else -1,
+            kwargs,
+        )
+
+    def up(self, **kwargs):
+        return self._beside(
+            lambda a, b: a["top"] - b["bottom"] if _overlap(a, b, "left") else -1,
+            kwargs,
+        )
+
+    def down(self, **kwargs):
+        return self._beside(
+            lambda a, b: b["top"] - a["bottom"] if _overlap(a, b, "left") else -1,
+            kwargs,
+        )
+
+
+def _overlap(a, b, side) -> bool:
+    end = "bottom" if side == "top" else "right"
+    return max(a[side], b[side]) < min(a[end], b[end])
+
+
+class ReplayAdbShell:
+    """The adb queries of a replay: the phone is always awake, unlocked and without keyboard"""
+
+    serial = ReplayDevice.serial
+
+    def shell(self, cmd):
+        return ""
+
+    def devices_count(self) -> int:
+        return 1
+
+    def dumpsys_flag(self, service, flag):
+        return False
+
+    def get_setting(self, namespace, key):
+        return None
+
+    def put_setting(self, namespace, key, value) -> bool:
+        return True
+
+    def package_version(self, package):
+        return None
+
+    def set_ime(self, ime) -> bool:
+        return True
+
+    def open_url(self, url) -> bool:
+        return True
+
+
+class ReplayConnection:
+    """DeviceConnection of a recording, there's no agent to look after"""
+
+    def __init__(self, directory):
+        self.device_id = None
+        self.client = ReplayDevice(directory)
+        self.adb = ReplayAdbShell()
+
+    def is_alive(self) -> bool:
+        return True
+
+    def heal(self) -> bool:
+        return True
+
+    def kill_agent(self):
+        pass
+
+    def restart_agent(self) -> bool:
+        return True
@@ -195,6 +195,38 @@ def print_scrape_report(source, session_state):
     )
 
 
+def print_rpc_report(rpc_stats):
+    calls, seconds = rpc_stats.total()
+    if not calls:
+        return
+    logger.info(
+        f"uiautomator2 calls: {calls} in {seconds:.1f}s",
+        extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
+    )
+    logger.info(
+        f"{'method':<16}{'count':>8}{'total':>10}{'mean':>9}{'p95':>9}{'max':>9}",
+        extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
+    )
+    for method, stats in sorted(
+        rpc_stats.methods.items(), key=lambda item: item[1]["seconds"], reverse=True
+    ):
+        logger.info(
+            f"{method:<16}{stats['count']:>8}{stats['seconds']:>9.1f}s"
+            f"{stats['seconds'] / stats['count']:>8.3f}s"
+            f"{rpc_stats.percentile(method, 95):>8.3f}s{stats['max']:>8.3f}s",
+            extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
+        )
+    logger.info(
+        "Slowest views:",
+        extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
+    )
+    for selector, stats in rpc_stats.top_views():
+        logger.info(
+            f"{stats['seconds']:>7.1f}s in {stats['count']} calls - {selector}",
+            extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
+        )
+
+
 def _stringify_interactions(interactions):
     if len(interactions) == 0:
         return "0"
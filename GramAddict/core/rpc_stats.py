@@ -0,0 +1,88 @@
+import json
+import os
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from atomicwrites import atomic_write
+
+# upper bounds in seconds of the latency histograms, the last bucket is for the slower ones
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RPC_STATS = "rpc_stats"
+
+
+class RpcStats:
+    """How many uiautomator2 calls DeviceFacade did, how long they took and for which views"""
+
+    def __init__(self):
+        self.methods = {}
+        self.views = {}
+
+    def add(self, method, selector, elapsed):
+        stats = self.methods.setdefault(
+            method,
+            {
+                "count": 0,
+                "seconds": 0.0,
+                "max": 0.0,
+                "histogram": [0] * (len(BUCKETS) + 1),
+            },
+        )
+        stats["count"] += 1
+        stats["seconds"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        stats["histogram"][bisect_left(BUCKETS, elapsed)] += 1
+        if selector is not None:
+            view = self.views.setdefault(selector, {"count": 0, "seconds": 0.0})
+            view["count"] += 1
+            view["seconds"] += elapsed
+
+    def total(self):
+        return sum(stats["count"] for stats in self.methods.values()), sum(
+            stats["seconds"] for stats in self.methods.values()
+        )
+
+    def percentile(self, method, percent):
+        """upper bound of the bucket that contains the percentile"""
+        stats = self.methods[method]
+        rank = stats["count"] * percent / 100
+        seen = 0
+        for bucket, count in enumerate(stats["histogram"]):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[bucket] if bucket < len(BUCKETS) else stats["max"]
+        return stats["max"]
+
+    def top_views(self, n=10):
+        return sorted(
+            self.views.items(), key=lambda item: item[1]["seconds"], reverse=True
+        )[:n]
+
+    def save(self, directory, session_id):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        path = os.path.join(directory, f"{session_id}.json")
+        with atomic_write(path, overwrite=True, encoding="utf-8") as outfile:
+            json.dump(
+                {"buckets": BUCKETS, "methods": self.methods, "views": self.views},
+                outfile,
+                indent=4,
+            )
+        return path
+
+    def reset(self):
+        self.methods = {}
+        self.views = {}
+
+
+@contextmanager
+def measure(rpc_stats, method, selector=None):
+    """times the uiautomator2 call in the block, does nothing if rpc_stats is None"""
+    if rpc_stats is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        rpc_stats.add(method, selector, perf_counter() - start)
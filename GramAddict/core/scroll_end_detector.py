@@ -1,4 +1,6 @@
+import hashlib
 import logging
+from collections import deque
 
 from colorama import Fore
 
@@ -10,7 +12,6 @@ class ScrollEndDetector:
     repeats_to_end = 0
     skipped_all = 0
     skipped_all_fling = 0
-    pages = []
 
     def __init__(
         self, repeats_to_end=5, skipped_list_limit=999, skipped_fling_limit=999
@@ -18,13 +19,17 @@ class ScrollEndDetector:
         self.repeats_to_end = repeats_to_end
         self.skipped_list_limit = skipped_list_limit
         self.skipped_fling_limit = skipped_fling_limit
+        self.skipped_all = 0
+        self.skipped_all_fling = 0
+        # only the last pages are compared, each one is a hash of its usernames
+        self.pages = deque(maxlen=max(repeats_to_end, 2))
 
     def notify_new_page(self):
-        self.pages.append([])
+        self.pages.append(hashlib.blake2b(digest_size=16))
 
     def notify_username_iterated(self, username):
         last_page = self.pages[-1]
-        last_page.append(username)
+        last_page.update(username.encode("utf-8") + b"\0")
 
     def reset_skipped_all(self):
         self.skipped_all = 0
@@ -54,10 +59,10 @@ class ScrollEndDetector:
             return False
 
         is_the_end = True
-        last_page = self.pages[-1]
+        last_page = self.pages[-1].digest()
         repeats = 1
         for i in range(2, min(self.repeats_to_end + 1, len(self.pages) + 1)):
-            page = self.pages[-i]
+            page = self.pages[-i].digest()
             if page != last_page:
                 is_the_end = False
                 break
@@ -1,13 +1,51 @@
+import json
 import logging
+import os
+import threading
 import uuid
 from datetime import datetime, timedelta
 from enum import Enum, auto
 from json import JSONEncoder
 
+from atomicwrites import atomic_write
+
+from GramAddict.core.persistent_list import append_persistent_items
+from GramAddict.core.storage import ACCOUNTS
 from GramAddict.core.utils import get_value
 
 logger = logging.getLogger(__name__)
 
+FILENAME_SESSION_CHECKPOINT = "session_checkpoint.json"
+# the running session is saved after this many interactions or seconds
+CHECKPOINT_EVERY = 5
+CHECKPOINT_INTERVAL = 60
+# what's needed to resume a session, SessionStateEncoder only keeps the sums
+CHECKPOINT_COUNTERS = (
+    "totalInteractions",
+    "successfulInteractions",
+    "totalFollowed",
+    "totalLikes",
+    "totalComments",
+    "totalPm",
+    "totalWatched",
+    "totalUnfollowed",
+    "removedMassFollowers",
+    "totalScraped",
+    "totalCrashes",
+)
+CHECKPOINT_LIMITS = (
+    "current_likes_limit",
+    "current_follow_limit",
+    "current_unfollow_limit",
+    "current_comments_limit",
+    "current_pm_limit",
+    "current_watch_limit",
+    "current_success_limit",
+    "current_total_limit",
+    "current_scraped_limit",
+    "current_crashes_limit",
+)
+
 
 class SessionState:
     id = None
@@ -29,6 +67,7 @@ class SessionState:
     totalCrashes = 0
     startTime = None
     finishTime = None
+    checkpoint = None
 
     def __init__(self, configs):
         self.id = str(uuid.uuid4())
@@ -50,6 +89,7 @@ class SessionState:
         self.totalCrashes = 0
         self.startTime = datetime.now()
         self.finishTime = None
+        self.checkpoint = None
 
     def add_interaction(self, source, succeed, followed, scraped):
         if self.totalInteractions.get(source) is None:
@@ -75,6 +115,57 @@ class SessionState:
             if scraped:
                 self.totalScraped[source] += 1
                 self.successfulInteractions[source] += 1
+        if self.checkpoint is not None:
+            self.checkpoint.notify()
+
+    def to_checkpoint(self):
+        session = SessionStateEncoder.default(SessionStateEncoder, self)
+        # str() drops the microseconds when they're 0, this is always parsable
+        session["start_time"] = self.startTime.isoformat(" ", "microseconds")
+        return {
+            "session": session,
+            "counters": {name: getattr(self, name) for name in CHECKPOINT_COUNTERS},
+            "limits": {name: getattr(self.args, name) for name in CHECKPOINT_LIMITS},
+        }
+
+    def resume(self, checkpoint):
+        """continue a session killed before the end, with its counters and limits"""
+        self.id = checkpoint["session"]["id"]
+        self.startTime = datetime.fromisoformat(checkpoint["session"]["start_time"])
+        for name, value in checkpoint["counters"].items():
+            setattr(self, name, value)
+        for name, value in checkpoint["limits"].items():
+            setattr(self.args, name, value)
+
+    def start_checkpoint(self):
+        """
+        recover the session killed without saving and save this one periodically,
+        a session started today is resumed, an older one is just added to sessions.jsonl
+        """
+        self.checkpoint = SessionCheckpoint(self)
+        checkpoint = self.checkpoint.load()
+        if checkpoint is not None:
+            started = checkpoint["session"]["start_time"]
+            if started[:10] == datetime.now().strftime("%Y-%m-%d"):
+                logger.info(
+                    f"Resuming the session started at {started[11:19]} and interrupted at {checkpoint['saved_at'][11:19]}."
+                )
+                self.resume(checkpoint)
+            else:
+                logger.info(
+                    f"Saving the stats of the session started on {started[:16]} and interrupted on {checkpoint['saved_at'][:16]}."
+                )
+                checkpoint["session"]["finish_time"] = checkpoint["saved_at"]
+                append_persistent_items(
+                    self.my_username, "sessions", [checkpoint["session"]]
+                )
+        self.checkpoint.start()
+
+    def stop_checkpoint(self):
+        """the session has been saved in sessions.jsonl, nothing to recover anymore"""
+        if self.checkpoint is not None:
+            self.checkpoint.remove()
+            self.checkpoint = None
 
     def set_limits_session(
         self,
@@ -109,6 +200,30 @@ class SessionState:
             self.args.total_crashes_limit, None, 5
         )
 
+    def set_rolling_limits(self, interaction_counters):
+        """lower the session limits with what has been done in the last 24 hours / 7 days"""
+        for kind, session_limit in (
+            ("likes", "current_likes_limit"),
+            ("follows", "current_follow_limit"),
+            ("unfollows", "current_unfollow_limit"),
+            ("pm", "current_pm_limit"),
+        ):
+            for period, hours in (("daily", 24), ("weekly", 24 * 7)):
+                limit = get_value(getattr(self.args, f"{period}_{kind}_limit"), None)
+                if limit is None:
+                    continue
+                done = interaction_counters.count(kind, hours)
+                # a resumed session has already done part of them, but only the
+                # ones stored before it was killed are in done
+                left = max(limit - done, 0) + interaction_counters.session_count(
+                    self.id, kind
+                )
+                if left < int(getattr(self.args, session_limit)):
+                    logger.info(
+                        f"{done} {kind} done in the last {hours} hours ({period} limit: {limit}). This session can do {left} {kind} at most."
+                    )
+                    setattr(self.args, session_limit, left)
+
     def check_limit(self, limit_type=None, output=False):
         """Returns True if limit reached - else False"""
         limit_type = SessionState.Limit.ALL if limit_type is None else limit_type
@@ -297,6 +412,69 @@ class SessionState:
         CRASHES = auto()
 
 
+class SessionCheckpoint:
+    """The running session rewritten in a small file every few interactions or seconds"""
+
+    def __init__(self, session_state):
+        self.session_state = session_state
+        self.path = os.path.join(
+            ACCOUNTS, session_state.my_username, FILENAME_SESSION_CHECKPOINT
+        )
+        self.pending = 0
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.writer = threading.Thread(
+            target=self._writer_loop, name="session-checkpoint", daemon=True
+        )
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as json_file:
+                return json.load(json_file)
+        except ValueError as e:
+            logger.warning(f"Ignoring {self.path}, it contains this error: {e}")
+            return None
+
+    def start(self):
+        self.save()
+        self.writer.start()
+
+    def notify(self):
+        self.pending += 1
+        if self.pending >= CHECKPOINT_EVERY:
+            self.event.set()
+
+    def _writer_loop(self):
+        while not self.stopped:
+            self.event.wait(CHECKPOINT_INTERVAL)
+            self.event.clear()
+            try:
+                self.save()
+            except Exception as e:
+                # e.g. a counter changed while it was serialized, next time will be fine
+                logger.debug(f"Failed to save {self.path}: {e}")
+
+    def save(self):
+        with self.lock:
+            if self.stopped:
+                return
+            self.pending = 0
+            checkpoint = self.session_state.to_checkpoint()
+            checkpoint["saved_at"] = datetime.now().isoformat(" ", "microseconds")
+            with atomic_write(self.path, overwrite=True, encoding="utf-8") as outfile:
+                json.dump(checkpoint, outfile)
+
+    def remove(self):
+        with self.lock:
+            self.stopped = True
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+        self.event.set()
+
+
 class SessionStateEncoder(JSONEncoder):
     def default(self, session_state: SessionState):
         return {
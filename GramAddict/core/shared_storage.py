@@ -0,0 +1,90 @@
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+from GramAddict.core.storage import ACCOUNTS
+
+logger = logging.getLogger(__name__)
+
+FILENAME_SHARED_DATABASE = "shared_storage.db"
+# seconds a bot waits for another one to release the database lock
+LOCK_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_users (
+    username TEXT NOT NULL,
+    account TEXT NOT NULL,
+    evaluated REAL,
+    skip_reason TEXT,
+    interacted REAL,
+    PRIMARY KEY (username, account)
+);
+"""
+
+
+class SharedStorage:
+    """Users evaluated and interacted by every account of this host, safe with many bot processes"""
+
+    def __init__(self, my_username):
+        self.my_username = my_username
+        if not os.path.exists(ACCOUNTS):
+            os.makedirs(ACCOUNTS)
+        self.database_path = os.path.join(ACCOUNTS, FILENAME_SHARED_DATABASE)
+        try:
+            # autocommit, the write transactions are opened with BEGIN IMMEDIATE
+            self.db = sqlite3.connect(
+                self.database_path, timeout=LOCK_TIMEOUT, isolation_level=None
+            )
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+        except sqlite3.DatabaseError as e:
+            logger.error(
+                f"Please check {self.database_path}, it contains this error: {e}"
+            )
+            sys.exit(0)
+
+    def _save(self, username, **values):
+        columns = ", ".join(f"{column} = ?" for column in values)
+        try:
+            with self.db:
+                # take the write lock now, so two bots can't interleave the two statements
+                self.db.execute("BEGIN IMMEDIATE")
+                self.db.execute(
+                    "INSERT OR IGNORE INTO shared_users (username, account) VALUES (?, ?)",
+                    (username, self.my_username),
+                )
+                self.db.execute(
+                    f"UPDATE shared_users SET {columns} WHERE username = ? AND account = ?",
+                    tuple(values.values()) + (username, self.my_username),
+                )
+        except sqlite3.OperationalError as e:
+            # the shared storage is just an hint, the account storage is the one that matters
+            logger.warning(f"Can't save @{username} in {self.database_path}: {e}")
+
+    def add_filtered_user(self, username, skip_reason=None):
+        self._save(username, evaluated=time.time(), skip_reason=skip_reason)
+
+    def add_interacted_user(self, username):
+        self._save(username, interacted=time.time())
+
+    def check_user_was_seen(self, username, hours):
+        """
+        returns (account, skip_reason) if another account rejected or interacted that user
+        in the last hours, skip_reason is None for an interaction. None if nobody did
+        """
+        since = time.time() - hours * 3600
+        return self.db.execute(
+            """
+            SELECT account, CASE WHEN interacted >= ? THEN NULL ELSE skip_reason END
+            FROM shared_users
+            WHERE username = ? AND account != ?
+            AND (interacted >= ? OR evaluated >= ? AND skip_reason IS NOT NULL)
+            LIMIT 1
+            """,
+            (since, username, self.my_username, since, since),
+        ).fetchone()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,383 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+from GramAddict.core.storage import (
+    ACCOUNTS,
+    ARCHIVE,
+    COUNTERS_RETENTION_HOURS,
+    DATETIME_FORMAT,
+    FILENAME_BLACKLIST,
+    FILENAME_HISTORY_FILTER_USERS,
+    FILENAME_INTERACTED_USERS,
+    FILENAME_INTERACTION_COUNTERS,
+    FILENAME_LIST_CURSORS,
+    FILENAME_WHITELIST,
+    FILTER,
+    OLD_FILTER,
+    REPORTS,
+    USER_FOLLOWING_STATUS,
+    USER_LAST_INTERACTION,
+    FollowingStatus,
+    InteractedUser,
+    InteractionCounters,
+    ListCursors,
+    ColdArchive,
+    Storage,
+    _open_storages,
+    from_epoch,
+    load_user_list,
+)
+
+logger = logging.getLogger(__name__)
+
+FILENAME_DATABASE = "storage.db"
+# bump it when the schema changes, 0 means that the json files haven't been imported yet
+SCHEMA_VERSION = 3
+
+INTERACTED_USERS_COLUMNS = (
+    USER_LAST_INTERACTION,
+    USER_FOLLOWING_STATUS,
+    "session_id",
+    "job_name",
+    "target",
+    "liked",
+    "watched",
+    "commented",
+    "followed",
+    "unfollowed",
+    "scraped",
+    "pm_sent",
+    # json of the fields we don't have a column for
+    "extra",
+)
+BOOLEAN_COLUMNS = ("followed", "unfollowed", "scraped", "pm_sent")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS interacted_users (
+    username TEXT PRIMARY KEY,
+    {USER_LAST_INTERACTION} TEXT NOT NULL,
+    {USER_FOLLOWING_STATUS} TEXT NOT NULL,
+    session_id TEXT,
+    job_name TEXT,
+    target TEXT,
+    liked INTEGER NOT NULL DEFAULT 0,
+    watched INTEGER NOT NULL DEFAULT 0,
+    commented INTEGER NOT NULL DEFAULT 0,
+    followed INTEGER NOT NULL DEFAULT 0,
+    unfollowed INTEGER NOT NULL DEFAULT 0,
+    scraped INTEGER NOT NULL DEFAULT 0,
+    pm_sent INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interacted_last_interaction
+    ON interacted_users ({USER_LAST_INTERACTION});
+CREATE INDEX IF NOT EXISTS idx_interacted_following_status
+    ON interacted_users ({USER_FOLLOWING_STATUS});
+CREATE INDEX IF NOT EXISTS idx_interacted_job_name ON interacted_users (job_name);
+CREATE INDEX IF NOT EXISTS idx_interacted_target ON interacted_users (target);
+CREATE TABLE IF NOT EXISTS history_filter_users (
+    username TEXT PRIMARY KEY,
+    datetime TEXT,
+    skip_reason TEXT,
+    profile TEXT NOT NULL
+);
+"""
+INSERT_INTERACTED_USER = f"INSERT OR REPLACE INTO interacted_users VALUES ({', '.join('?' * (len(INTERACTED_USERS_COLUMNS) + 1))})"
+
+
+class SQLiteStorage(Storage):
+    """Same API of Storage, but backed by an indexed sqlite database in WAL mode"""
+
+    def __init__(self, my_username):
+        if my_username is None:
+            logger.error(
+                "No username, thus the script won't get access to interacted users and sessions data."
+            )
+            return
+        self.journal = False
+        self.account_path = os.path.join(ACCOUNTS, my_username)
+        if not os.path.exists(self.account_path):
+            os.makedirs(self.account_path)
+        self.interacted_users_path = os.path.join(
+            self.account_path, FILENAME_INTERACTED_USERS
+        )
+        self.history_filter_users_path = os.path.join(
+            self.account_path, FILENAME_HISTORY_FILTER_USERS
+        )
+        self.database_path = os.path.join(self.account_path, FILENAME_DATABASE)
+        try:
+            self.db = sqlite3.connect(self.database_path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+        except sqlite3.DatabaseError as e:
+            logger.error(
+                f"Please check {self.database_path}, it contains this error: {e}"
+            )
+            sys.exit(0)
+        schema_version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version == 0:
+            self._migrate_from_json()
+        elif schema_version < SCHEMA_VERSION:
+            with self.db:
+                if schema_version < 2:
+                    self.db.execute(
+                        "ALTER TABLE interacted_users ADD COLUMN extra TEXT"
+                    )
+                # the whitelist and the blacklist are looked up in memory
+                self.db.execute("DROP TABLE IF EXISTS whitelist")
+                self.db.execute("DROP TABLE IF EXISTS blacklist")
+                self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+        self.filter_path = os.path.join(self.account_path, FILTER)
+        if not os.path.exists(self.filter_path):
+            self.filter_path = os.path.join(self.account_path, OLD_FILTER)
+
+        # the txt files are small, the sets of Storage are enough for them
+        self.whitelist = load_user_list(
+            os.path.join(self.account_path, FILENAME_WHITELIST)
+        )
+        self.blacklist = load_user_list(
+            os.path.join(self.account_path, FILENAME_BLACKLIST)
+        )
+
+        self.interaction_counters = InteractionCounters(
+            os.path.join(self.account_path, FILENAME_INTERACTION_COUNTERS)
+        )
+        # the interactions stored after the last save of the counters
+        since = max(
+            datetime.now() - timedelta(hours=COUNTERS_RETENTION_HOURS),
+            from_epoch(self.interaction_counters.last_interaction),
+        )
+        self.interaction_counters.seed(
+            InteractedUser.from_dict(self._from_row(row))
+            for row in self.db.execute(
+                f"SELECT {', '.join(INTERACTED_USERS_COLUMNS)} FROM interacted_users WHERE {USER_LAST_INTERACTION} >= ?",
+                (since.strftime(DATETIME_FORMAT),),
+            )
+        )
+        self.list_cursors = ListCursors(
+            os.path.join(self.account_path, FILENAME_LIST_CURSORS)
+        )
+
+        self.report_path = os.path.join(self.account_path, REPORTS)
+        self.shared_storage = None
+        # the rolling counters are saved by flush_storages() too
+        _open_storages.add(self)
+        atexit.register(self.close)
+
+    def _migrate_from_json(self):
+        """one-shot import of interacted_users.json and history_filters_users.json"""
+        # the json engine already knows how to read the files and its journal
+        storage = Storage(os.path.basename(self.account_path))
+        with self.db:
+            self.db.executemany(
+                INSERT_INTERACTED_USER,
+                (
+                    self._to_row(username, user.to_dict())
+                    for username, user in storage.interacted_users.items()
+                ),
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO history_filter_users VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        username,
+                        profile.get("datetime"),
+                        profile.get("skip_reason"),
+                        json.dumps(profile),
+                    )
+                    for username, profile in storage.history_filter_users.items()
+                ),
+            )
+            self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        storage.close()
+        if storage.interacted_users or storage.history_filter_users:
+            logger.info(
+                f"Imported {len(storage.interacted_users)} interacted user(s) and {len(storage.history_filter_users)} filtered user(s) in {self.database_path}. The json files won't be used anymore."
+            )
+
+    @staticmethod
+    def _to_row(username, user):
+        extra = {
+            key: value
+            for key, value in user.items()
+            if key not in INTERACTED_USERS_COLUMNS
+        }
+        return (
+            (username,)
+            + tuple(
+                user.get(column, False if column in BOOLEAN_COLUMNS else None)
+                for column in INTERACTED_USERS_COLUMNS[:-1]
+            )
+            + (json.dumps(extra) if extra else None,)
+        )
+
+    @staticmethod
+    def _from_row(row):
+        user = dict(zip(INTERACTED_USERS_COLUMNS, row))
+        for column in BOOLEAN_COLUMNS:
+            user[column] = bool(user[column])
+        extra = user.pop("extra")
+        if extra:
+            user.update(json.loads(extra))
+        return user
+
+    def _get_interacted_user(self, username):
+        row = self.db.execute(
+            f"SELECT {', '.join(INTERACTED_USERS_COLUMNS)} FROM interacted_users WHERE username = ?",
+            (username,),
+        ).fetchone()
+        if row is None:
+            return None
+        return InteractedUser.from_dict(self._from_row(row))
+
+    def check_user_was_interacted(self, username):
+        """returns when a username has been interacted, False if not already interacted"""
+        row = self.db.execute(
+            f"SELECT {USER_LAST_INTERACTION} FROM interacted_users WHERE username = ?",
+            (username,),
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, datetime.strptime(row[0], DATETIME_FORMAT)
+
+    def get_following_status(self, username):
+        row = self.db.execute(
+            f"SELECT {USER_FOLLOWING_STATUS} FROM interacted_users WHERE username = ?",
+            (username,),
+        ).fetchone()
+        if row is None:
+            return FollowingStatus.NOT_IN_LIST
+        return FollowingStatus[row[0].upper()]
+
+    def add_filter_user(self, username, profile_data, skip_reason=None):
+        self._share_filter_user(username, skip_reason)
+        profile = self._filter_record(profile_data, skip_reason)
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO history_filter_users VALUES (?, ?, ?, ?)",
+                (
+                    username,
+                    profile.get("datetime"),
+                    profile["skip_reason"],
+                    json.dumps(profile),
+                ),
+            )
+
+    def get_filter_user(self, username):
+        """the last filter result saved for that user, None if never checked"""
+        row = self.db.execute(
+            "SELECT profile FROM history_filter_users WHERE username = ?", (username,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def add_interacted_user(
+        self,
+        username,
+        session_id,
+        followed=False,
+        is_requested=None,
+        unfollowed=False,
+        scraped=False,
+        liked=0,
+        watched=0,
+        commented=0,
+        pm_sent=False,
+        job_name=None,
+        target=None,
+    ):
+        user = self._get_interacted_user(username)
+        previous = None if user is None else user.last_interaction
+        if user is None:
+            user = InteractedUser()
+        user.add_interaction(
+            session_id,
+            followed=followed,
+            is_requested=is_requested,
+            unfollowed=unfollowed,
+            scraped=scraped,
+            liked=liked,
+            watched=watched,
+            commented=commented,
+            pm_sent=pm_sent,
+            job_name=job_name,
+            target=target,
+        )
+        with self.db:
+            self.db.execute(
+                INSERT_INTERACTED_USER,
+                self._to_row(username, user.to_dict()),
+            )
+        self.interaction_counters.add_interaction(
+            followed,
+            unfollowed,
+            liked,
+            pm_sent,
+            previous,
+            user.last_interaction,
+            session_id,
+        )
+        self.interaction_counters.save()
+        if self.shared_storage is not None:
+            self.shared_storage.add_interacted_user(username)
+
+    def _get_last_day_interactions_count(self):
+        since = (datetime.now() - timedelta(days=1)).strftime(DATETIME_FORMAT)
+        return self.db.execute(
+            f"SELECT COUNT(*) FROM interacted_users WHERE {USER_LAST_INTERACTION} >= ?",
+            (since,),
+        ).fetchone()[0]
+
+    def archive(self, max_age_days):
+        now = datetime.now()
+        since = now - timedelta(days=max_age_days)
+        interacted_archive = ColdArchive(self._archive_file("interacted_users", now))
+        filter_archive = ColdArchive(self._archive_file("history_filters_users", now))
+        interacted_where = f"{USER_LAST_INTERACTION} < ? AND {USER_FOLLOWING_STATUS} NOT IN ('followed', 'requested')"
+        try:
+            for row in self.db.execute(
+                f"SELECT username, {', '.join(INTERACTED_USERS_COLUMNS)} FROM interacted_users WHERE {interacted_where}",
+                (since.strftime(DATETIME_FORMAT),),
+            ):
+                interacted_archive.add(row[0], self._from_row(row[1:]))
+            for username, profile in self.db.execute(
+                "SELECT username, profile FROM history_filter_users WHERE datetime < ?",
+                (str(since),),
+            ):
+                filter_archive.add(username, json.loads(profile))
+        finally:
+            interacted_archive.close()
+            filter_archive.close()
+        with self.db:
+            self.db.execute(
+                f"DELETE FROM interacted_users WHERE {interacted_where}",
+                (since.strftime(DATETIME_FORMAT),),
+            )
+            self.db.execute(
+                "DELETE FROM history_filter_users WHERE datetime < ?", (str(since),)
+            )
+        if interacted_archive.count or filter_archive.count:
+            # give the free pages back to the file system, it rewrites the whole file
+            self.db.execute("VACUUM")
+        logger.info(
+            f"Archived {interacted_archive.count} interacted user(s) and {filter_archive.count} filtered user(s) older than {max_age_days} day(s) in {os.path.join(self.account_path, ARCHIVE)}."
+        )
+        return interacted_archive.count, filter_archive.count
+
+    def flush(self):
+        # every change of the database is committed right away
+        self.interaction_counters.save()
+
+    def close(self):
+        atexit.unregister(self.close)
+        _open_storages.discard(self)
+        self.flush()
+        self.db.close()
+        if self.shared_storage is not None:
+            self.shared_storage.close()
@@ -1,7 +1,13 @@
+import atexit
+import fnmatch
+import gzip
 import json
 import logging
 import os
+import re
 import sys
+import threading
+import weakref
 from datetime import datetime, timedelta
 from enum import Enum, unique
 from typing import Optional, Union
@@ -12,26 +18,605 @@ logger = logging.getLogger(__name__)
 
 ACCOUNTS = "accounts"
 REPORTS = "reports"
+ARCHIVE = "archive"
 FILENAME_HISTORY_FILTER_USERS = "history_filters_users.json"
+FILENAME_HISTORY_FILTER_USERS_JOURNAL = "history_filters_users.jsonl"
 FILENAME_INTERACTED_USERS = "interacted_users.json"
+FILENAME_INTERACTED_USERS_JOURNAL = "interacted_users.jsonl"
+FILENAME_INTERACTION_COUNTERS = "interaction_counters.json"
+FILENAME_LIST_CURSORS = "list_cursors.json"
 OLD_FILTER = "filter.json"
 FILTER = "filters.yml"
 USER_LAST_INTERACTION = "last_interaction"
 USER_FOLLOWING_STATUS = "following_status"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# naive on purpose: stored times are local and we don't want DST shifts when converting
+EPOCH = datetime(1970, 1, 1)
 
 FILENAME_WHITELIST = "whitelist.txt"
 FILENAME_BLACKLIST = "blacklist.txt"
 FILENAME_COMMENTS = "comments_list.txt"
 FILENAME_MESSAGES = "pm_list.txt"
 
+# How many journal lines we accept before folding them into interacted_users.json
+JOURNAL_COMPACT_THRESHOLD = 5000
+# history_filters_users.json is written in background after this many new records or seconds
+FILTER_HISTORY_FLUSH_EVERY = 50
+FILTER_HISTORY_FLUSH_INTERVAL = 60
+
+# hourly buckets of the interaction counters are kept for a week
+COUNTERS_RETENTION_HOURS = 7 * 24
+# a list cursor older than this is forgotten, the list has changed too much
+LIST_CURSOR_MAX_AGE_HOURS = 7 * 24
+
+# fields of the filter history that can be computed again or are often empty
+DERIVED_FILTER_FIELDS = ("potency_ratio",)
+OPTIONAL_FILTER_FIELDS = ("biography", "link_in_bio", "fullname", "mutual_friends")
+
+_open_storages = weakref.WeakSet()
+# whitelist and blacklist already parsed, they're read again only if the file changes
+_user_lists = {}
+
+
+def flush_storages():
+    """write on disk what's still pending, used when the bot stops or crashes"""
+    for storage in list(_open_storages):
+        storage.flush()
+
+
+def create_storage(my_username, engine="json", lazy=False, shared=False):
+    if engine == "sqlite":
+        from GramAddict.core.sqlite_storage import SQLiteStorage
+
+        storage = SQLiteStorage(my_username)
+    else:
+        if engine not in ("json", "journal"):
+            logger.error(f"Unknown storage engine '{engine}', json will be used.")
+        storage = Storage(my_username, journal=engine == "journal", lazy=lazy)
+    if shared:
+        from GramAddict.core.shared_storage import SharedStorage
+
+        storage.shared_storage = SharedStorage(my_username)
+    return storage
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_object(json_file, chunk_size=1 << 16):
+    """
+    Yield the (key, value) pairs of a file containing a json object, reading it
+    in chunks: only one value at a time is kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def refill():
+        nonlocal buffer, pos, eof
+        chunk = json_file.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def peek():
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return buffer[pos : pos + 1]
+            refill()
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(buffer) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            refill()
+
+    if peek() != "{":
+        raise ValueError("Expecting a json object")
+    pos += 1
+    if peek() == "}":
+        return
+    while True:
+        key = decode()
+        if peek() != ":":
+            raise ValueError(f"Expecting ':' delimiter after '{key}'")
+        pos += 1
+        peek()
+        yield key, decode()
+        delimiter = peek()
+        pos += 1
+        if delimiter == "}":
+            return
+        if delimiter != ",":
+            raise ValueError(f"Expecting ',' delimiter after '{key}'")
+        peek()
+
+
+def write_json_object(outfile, items):
+    """same output of json.dump(dict(items), indent=4), without building the dict"""
+    separator = "\n"
+    outfile.write("{")
+    for key, value in items:
+        outfile.write(
+            f"{separator}    {json.dumps(key)}: "
+            + json.dumps(value, indent=4).replace("\n", "\n    ")
+        )
+        separator = ",\n"
+    outfile.write("\n}" if separator != "\n" else "}")
+
+
+def compact_filter_record(user):
+    return {
+        key: value
+        for key, value in user.items()
+        if key not in DERIVED_FILTER_FIELDS
+        and not (key in OPTIONAL_FILTER_FIELDS and value in (None, ""))
+    }
+
+
+class ColdArchive:
+    """gzipped json lines, the file is created only if something gets archived"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.count = 0
+
+    def add(self, username, user):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = gzip.open(self.path, "wt", encoding="utf-8")
+        self.file.write(
+            json.dumps({"username": username, **user}, separators=(",", ":")) + "\n"
+        )
+        self.count += 1
+
+    def split(self, records, is_old):
+        """archive the old records and yield the others"""
+        for username, user in records:
+            if is_old(user):
+                self.add(username, user)
+            else:
+                yield username, user
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def normalize_username(username):
+    return username.strip().lstrip("@").casefold()
+
+
+def load_user_list(path):
+    user_list = _user_lists.get(path)
+    if user_list is None:
+        user_list = _user_lists[path] = UserList(path)
+    else:
+        user_list.reload_if_changed()
+    return user_list
+
+
+class UserList:
+    """
+    Usernames of a whitelist/blacklist file kept in a set for O(1) lookups.
+    Lines with * or ? (e.g. 'shop_*') are wildcard patterns, compiled once in a single regex.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.usernames = set()
+        self.pattern = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+        self.usernames = set()
+        patterns = []
+        if mtime is not None:
+            with open(self.path, encoding="utf-8") as file:
+                for line in file:
+                    username = normalize_username(line)
+                    if not username:
+                        continue
+                    if "*" in username or "?" in username:
+                        patterns.append(fnmatch.translate(username))
+                    else:
+                        self.usernames.add(username)
+            logger.debug(
+                f"Loaded {len(self.usernames)} username(s) and {len(patterns)} pattern(s) from {self.path}."
+            )
+        self.pattern = re.compile("|".join(patterns)) if patterns else None
+
+    def __contains__(self, username):
+        username = normalize_username(username)
+        return username in self.usernames or (
+            self.pattern is not None and self.pattern.match(username) is not None
+        )
+
+    def __len__(self):
+        return len(self.usernames)
+
+
+def to_epoch(moment: datetime) -> float:
+    return (moment - EPOCH).total_seconds()
+
+
+def from_epoch(seconds: float) -> datetime:
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def _intern(value):
+    # job names, targets and session ids repeat a lot among the records
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class InteractedUser:
+    """
+    In-memory record of an interacted user. The last interaction is parsed once in
+    epoch seconds and the status is a FollowingStatus, the json format is used only
+    when reading and writing the files.
+    """
+
+    __slots__ = (
+        "last_interaction",
+        "following_status",
+        "session_id",
+        "job_name",
+        "target",
+        "liked",
+        "watched",
+        "commented",
+        "followed",
+        "unfollowed",
+        "scraped",
+        "pm_sent",
+        "extra",
+    )
+
+    def __init__(self):
+        self.last_interaction = 0.0
+        self.following_status = FollowingStatus.NONE
+        self.session_id = None
+        self.job_name = None
+        self.target = None
+        self.liked = 0
+        self.watched = 0
+        self.commented = 0
+        self.followed = False
+        self.unfollowed = False
+        self.scraped = False
+        self.pm_sent = False
+        # fields we don't know about, kept only to write them back
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, user: dict) -> "InteractedUser":
+        user = dict(user)
+        record = cls()
+        record.last_interaction = to_epoch(
+            datetime.strptime(user.pop(USER_LAST_INTERACTION), DATETIME_FORMAT)
+        )
+        record.following_status = FollowingStatus[
+            user.pop(USER_FOLLOWING_STATUS).upper()
+        ]
+        record.session_id = _intern(user.pop("session_id", None))
+        record.job_name = _intern(user.pop("job_name", None))
+        record.target = _intern(user.pop("target", None))
+        record.liked = user.pop("liked", 0)
+        record.watched = user.pop("watched", 0)
+        record.commented = user.pop("commented", 0)
+        record.followed = user.pop("followed", False)
+        record.unfollowed = user.pop("unfollowed", False)
+        record.scraped = user.pop("scraped", False)
+        record.pm_sent = user.pop("pm_sent", False)
+        record.extra = user or None
+        return record
+
+    def to_dict(self) -> dict:
+        user = {
+            USER_LAST_INTERACTION: from_epoch(self.last_interaction).strftime(
+                DATETIME_FORMAT
+            ),
+            USER_FOLLOWING_STATUS: self.following_status.name.casefold(),
+            "session_id": self.session_id,
+            "job_name": self.job_name,
+            "target": self.target,
+            "liked": self.liked,
+            "watched": self.watched,
+            "commented": self.commented,
+            "followed": self.followed,
+            "unfollowed": self.unfollowed,
+            "scraped": self.scraped,
+            "pm_sent": self.pm_sent,
+        }
+        if self.extra:
+            user.update(self.extra)
+        return user
+
+    def add_interaction(
+        self,
+        session_id,
+        followed=False,
+        is_requested=None,
+        unfollowed=False,
+        scraped=False,
+        liked=0,
+        watched=0,
+        commented=0,
+        pm_sent=False,
+        job_name=None,
+        target=None,
+    ):
+        self.last_interaction = to_epoch(datetime.now())
+
+        if followed:
+            if is_requested:
+                self.following_status = FollowingStatus.REQUESTED
+            else:
+                self.following_status = FollowingStatus.FOLLOWED
+        elif unfollowed:
+            self.following_status = FollowingStatus.UNFOLLOWED
+        elif scraped:
+            self.following_status = FollowingStatus.SCRAPED
+        else:
+            self.following_status = FollowingStatus.NONE
+
+        # Save only the last session_id
+        self.session_id = _intern(session_id)
+
+        # Save only the first job_name and target
+        if not self.job_name:
+            self.job_name = _intern(job_name)
+        if not self.target:
+            self.target = _intern(target)
+
+        # Increase the value of liked, watched or commented
+        self.liked += liked
+        self.watched += watched
+        self.commented += commented
+
+        # The booleans always reflect the last interaction
+        self.followed = followed
+        self.unfollowed = unfollowed
+        self.scraped = scraped
+        self.pm_sent = pm_sent
+
+
+class InteractionCounters:
+    """
+    Hourly buckets with how many interactions, likes, follows, unfollows and PMs
+    have been done. Counting the last 24h or 7 days costs O(buckets) and
+    doesn't depend on how many users we have interacted with.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.buckets = {}
+        self.unsaved = False
+        # the newest interaction counted, the engine counts the ones after it with seed()
+        self.last_interaction = 0
+        # what each session has done, a resumed session gets back its part of the limits
+        self.sessions = {}
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as json_file:
+                try:
+                    counters = json.load(json_file)
+                    if "buckets" in counters:
+                        self.last_interaction = counters["last_interaction"]
+                        self.sessions = counters.get("sessions", {})
+                        counters = counters["buckets"]
+                    else:
+                        # saved by an older version, it was up to date when written
+                        self.last_interaction = to_epoch(
+                            datetime.fromtimestamp(os.path.getmtime(path))
+                        )
+                    self.buckets = {
+                        int(hour): counts for hour, counts in counters.items()
+                    }
+                except Exception as e:
+                    logger.error(
+                        f"Please check {json_file.name}, it contains this error: {e}. Rolling counters will start from zero."
+                    )
+
+    @staticmethod
+    def _current_hour():
+        return int(to_epoch(datetime.now()) // 3600)
+
+    def seed(self, users):
+        """
+        Count the InteractedUsers interacted after the last interaction counted: all of them
+        without a counters file, the ones lost by a hard kill otherwise. Every user counts
+        as one interaction, and likes are the ones of all its interactions.
+        """
+        since = self._current_hour() - COUNTERS_RETENTION_HOURS
+        last_interaction = self.last_interaction
+        for user in users:
+            hour = int(user.last_interaction // 3600)
+            if hour <= since or user.last_interaction <= last_interaction:
+                continue
+            self.last_interaction = max(self.last_interaction, user.last_interaction)
+            self.unsaved = True
+            counts = {
+                "users": 1,
+                "interactions": 1,
+                "likes": user.liked,
+                "follows": user.followed,
+                "unfollows": user.unfollowed,
+                "pm": user.pm_sent,
+            }
+            bucket = self.buckets.setdefault(hour, {})
+            for kind, value in counts.items():
+                if value:
+                    bucket[kind] = bucket.get(kind, 0) + int(value)
+            self._add_to_session(user.session_id, hour, counts)
+
+    def add(self, hour=None, **counts):
+        hour = self._current_hour() if hour is None else hour
+        bucket = self.buckets.setdefault(hour, {})
+        for kind, value in counts.items():
+            if value:
+                bucket[kind] = bucket.get(kind, 0) + int(value)
+        since = self._current_hour() - COUNTERS_RETENTION_HOURS
+        for old_hour in [h for h in self.buckets if h <= since]:
+            del self.buckets[old_hour]
+        for old_session in [
+            session_id
+            for session_id, counts in self.sessions.items()
+            if counts["hour"] <= since
+        ]:
+            del self.sessions[old_session]
+        self.unsaved = True
+
+    def _add_to_session(self, session_id, hour, counts):
+        if session_id is None:
+            return
+        session = self.sessions.setdefault(session_id, {})
+        session["hour"] = max(session.get("hour", hour), hour)
+        for kind, value in counts.items():
+            if value:
+                session[kind] = session.get(kind, 0) + int(value)
+
+    def session_count(self, session_id, kind):
+        """how many times that session did that kind of action, as far as the counters know"""
+        return self.sessions.get(session_id, {}).get(kind, 0)
+
+    def save(self):
+        """called by the engine once the interactions counted are stored"""
+        if not self.unsaved:
+            return
+        with atomic_write(self.path, overwrite=True, encoding="utf-8") as outfile:
+            json.dump(
+                {
+                    "last_interaction": self.last_interaction,
+                    "buckets": self.buckets,
+                    "sessions": self.sessions,
+                },
+                outfile,
+            )
+        self.unsaved = False
+
+    def count(self, kind, hours=24):
+        """how many times we did that kind of action in the last hours (current hour included)"""
+        since = self._current_hour() - hours
+        return sum(
+            counts.get(kind, 0) for hour, counts in self.buckets.items() if hour > since
+        )
+
+    def add_interaction(
+        self,
+        followed,
+        unfollowed,
+        liked,
+        pm_sent,
+        previous=None,
+        at=None,
+        session_id=None,
+    ):
+        """
+        previous: the last interaction with that user before this one, the "users"
+        buckets count each user only in the hour of its last interaction
+        at: when this interaction happened, now by default
+        """
+        if previous is not None:
+            bucket = self.buckets.get(int(previous // 3600))
+            if bucket is not None and bucket.get("users", 0) > 0:
+                bucket["users"] -= 1
+        at = to_epoch(datetime.now()) if at is None else at
+        self.last_interaction = max(self.last_interaction, at)
+        counts = {
+            "users": 1,
+            "interactions": 1,
+            "likes": liked,
+            "follows": followed,
+            "unfollows": unfollowed,
+            "pm": pm_sent,
+        }
+        self.add(hour=int(at // 3600), **counts)
+        self._add_to_session(session_id, int(at // 3600), counts)
+
+
+class ListCursors:
+    """How far we went in the list of each source, so the next run can start from there"""
+
+    def __init__(self, path):
+        self.path = path
+        self.cursors = {}
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as json_file:
+                try:
+                    self.cursors = json.load(json_file)
+                except Exception as e:
+                    logger.error(
+                        f"Please check {json_file.name}, it contains this error: {e}. Lists will start from the top."
+                    )
+
+    @staticmethod
+    def _key(job, source):
+        return f"{job}:{source}"
+
+    def get(self, job, source):
+        """{"scrolls": n, "username": last one seen} or None to start from the top"""
+        cursor = self.cursors.get(self._key(job, source))
+        if cursor is None:
+            return None
+        if (
+            to_epoch(datetime.now()) - cursor["updated"]
+            > LIST_CURSOR_MAX_AGE_HOURS * 3600
+        ):
+            self.reset(job, source)
+            return None
+        return cursor
+
+    def advance(self, job, source, username):
+        """we moved one step down the list after seeing username"""
+        cursor = self.cursors.get(self._key(job, source), {"scrolls": 0})
+        self.set(job, source, cursor["scrolls"] + 1, username)
+
+    def set(self, job, source, scrolls, username):
+        """we are scrolls steps down the list, username is the last one seen"""
+        self.cursors[self._key(job, source)] = {
+            "scrolls": scrolls,
+            "username": username,
+            "updated": to_epoch(datetime.now()),
+        }
+        self._save()
+
+    def reset(self, job, source):
+        if self.cursors.pop(self._key(job, source), None) is not None:
+            self._save()
+
+    def _save(self):
+        with atomic_write(self.path, overwrite=True, encoding="utf-8") as outfile:
+            json.dump(self.cursors, outfile)
+
 
 class Storage:
-    def __init__(self, my_username):
+    def __init__(self, my_username, journal=False, lazy=False):
         if my_username is None:
             logger.error(
                 "No username, thus the script won't get access to interacted users and sessions data."
             )
             return
+        self.journal = journal
+        self.journal_entries = 0
+        # lazy: stream interacted_users.json and never load the filter history
+        self.lazy = lazy
         self.account_path = os.path.join(ACCOUNTS, my_username)
         if not os.path.exists(self.account_path):
             os.makedirs(self.account_path)
@@ -44,17 +629,41 @@ class Storage:
         if os.path.isfile(self.interacted_users_path):
             with open(self.interacted_users_path, encoding="utf-8") as json_file:
                 try:
-                    self.interacted_users = json.load(json_file)
+                    users = (
+                        iter_json_object(json_file)
+                        if self.lazy
+                        else json.load(json_file).items()
+                    )
+                    self.interacted_users = {
+                        username: InteractedUser.from_dict(user)
+                        for username, user in users
+                    }
                 except Exception as e:
                     logger.error(
                         f"Please check {json_file.name}, it contains this error: {e}"
                     )
                     sys.exit(0)
+        self.interaction_counters = InteractionCounters(
+            os.path.join(self.account_path, FILENAME_INTERACTION_COUNTERS)
+        )
+        self.interacted_users_journal_path = os.path.join(
+            self.account_path, FILENAME_INTERACTED_USERS_JOURNAL
+        )
+        self._replay_journal()
+        # the interactions stored after the last save of the counters
+        self.interaction_counters.seed(self.interacted_users.values())
+        if not self.journal and self.journal_entries > 0:
+            # journal mode has been disabled, fold what's left in the json file
+            self.compact_journal()
         self.history_filter_users_path = os.path.join(
             self.account_path, FILENAME_HISTORY_FILTER_USERS
         )
+        self.history_filter_users_journal_path = os.path.join(
+            self.account_path, FILENAME_HISTORY_FILTER_USERS_JOURNAL
+        )
+        self.filter_history_pending = 0
 
-        if os.path.isfile(self.history_filter_users_path):
+        if not self.lazy and os.path.isfile(self.history_filter_users_path):
             with open(self.history_filter_users_path, encoding="utf-8") as json_file:
                 try:
                     self.history_filter_users = json.load(json_file)
@@ -63,25 +672,36 @@ class Storage:
                         f"Please check {json_file.name}, it contains this error: {e}"
                     )
                     sys.exit(0)
+        if not self.lazy and os.path.isfile(self.history_filter_users_journal_path):
+            # records appended by a lazy session, they'll be moved in the json file
+            for username, user in self._iter_filter_history_journal():
+                self.history_filter_users[username] = user
+                self.filter_history_pending += 1
+        self.filter_history_lock = threading.Lock()
+        self.filter_history_write_lock = threading.Lock()
+        self.filter_history_event = threading.Event()
+        self.filter_history_writer = None
+        self.closed = False
         self.filter_path = os.path.join(self.account_path, FILTER)
         if not os.path.exists(self.filter_path):
             self.filter_path = os.path.join(self.account_path, OLD_FILTER)
 
-        whitelist_path = os.path.join(self.account_path, FILENAME_WHITELIST)
-        if os.path.exists(whitelist_path):
-            with open(whitelist_path, encoding="utf-8") as file:
-                self.whitelist = [line.rstrip() for line in file]
-        else:
-            self.whitelist = []
+        self.whitelist = load_user_list(
+            os.path.join(self.account_path, FILENAME_WHITELIST)
+        )
+        self.blacklist = load_user_list(
+            os.path.join(self.account_path, FILENAME_BLACKLIST)
+        )
 
-        blacklist_path = os.path.join(self.account_path, FILENAME_BLACKLIST)
-        if os.path.exists(blacklist_path):
-            with open(blacklist_path, encoding="utf-8") as file:
-                self.blacklist = [line.rstrip() for line in file]
-        else:
-            self.blacklist = []
+        self.list_cursors = ListCursors(
+            os.path.join(self.account_path, FILENAME_LIST_CURSORS)
+        )
 
         self.report_path = os.path.join(self.account_path, REPORTS)
+        # users seen by the other accounts of this host, see create_storage
+        self.shared_storage = None
+        _open_storages.add(self)
+        atexit.register(self.close)
 
     def can_be_reinteract(
         self,
@@ -117,33 +737,125 @@ class Storage:
         user = self.interacted_users.get(username)
         if user is None:
             return False, None
-
-        last_interaction = datetime.strptime(
-            user[USER_LAST_INTERACTION], "%Y-%m-%d %H:%M:%S.%f"
-        )
-        return True, last_interaction
+        return True, from_epoch(user.last_interaction)
 
     def get_following_status(self, username):
         user = self.interacted_users.get(username)
         if user is None:
             return FollowingStatus.NOT_IN_LIST
         else:
-            return FollowingStatus[user[USER_FOLLOWING_STATUS].upper()]
+            return user.following_status
 
-    def add_filter_user(self, username, profile_data, skip_reason=None):
-        user = profile_data.__dict__
+    @staticmethod
+    def _filter_record(profile_data, skip_reason=None):
+        user = compact_filter_record(profile_data.__dict__)
         user["follow_button_text"] = (
             profile_data.follow_button_text.name
             if not profile_data.is_restricted
             else None
         )
         user["skip_reason"] = None if skip_reason is None else skip_reason.name
-        self.history_filter_users[username] = user
-        if self.history_filter_users_path is not None:
+        return user
+
+    def _share_filter_user(self, username, skip_reason):
+        if self.shared_storage is not None:
+            self.shared_storage.add_filtered_user(
+                username, None if skip_reason is None else skip_reason.name
+            )
+
+    def check_user_was_seen_by_other_accounts(self, username, hours):
+        """(account, skip_reason) of another account that rejected or interacted the user, see SharedStorage"""
+        if self.shared_storage is None:
+            return None
+        return self.shared_storage.check_user_was_seen(username, hours)
+
+    def add_filter_user(self, username, profile_data, skip_reason=None):
+        self._share_filter_user(username, skip_reason)
+        user = self._filter_record(profile_data, skip_reason)
+        with self.filter_history_lock:
+            self.history_filter_users[username] = user
+            self.filter_history_pending += 1
+            pending = self.filter_history_pending
+        if self.filter_history_writer is None:
+            self.filter_history_writer = threading.Thread(
+                target=self._filter_history_writer_loop,
+                name="filter-history-writer",
+                daemon=True,
+            )
+            self.filter_history_writer.start()
+        if pending >= FILTER_HISTORY_FLUSH_EVERY:
+            self.filter_history_event.set()
+
+    def _filter_history_writer_loop(self):
+        """write-behind for history_filters_users.json, the bot never waits for the disk"""
+        while not self.closed:
+            self.filter_history_event.wait(FILTER_HISTORY_FLUSH_INTERVAL)
+            self.filter_history_event.clear()
+            try:
+                self.flush_filter_history()
+            except Exception as e:
+                logger.error(f"Failed to save {self.history_filter_users_path}: {e}")
+
+    def flush_filter_history(self):
+        with self.filter_history_write_lock:
+            with self.filter_history_lock:
+                if self.filter_history_pending == 0:
+                    return
+                if self.lazy:
+                    # only the new records are in memory, they are appended
+                    history_filter_users = self.history_filter_users
+                    self.history_filter_users = {}
+                else:
+                    # a shallow copy is enough, the records are never changed once added
+                    history_filter_users = dict(self.history_filter_users)
+                self.filter_history_pending = 0
+            if self.lazy:
+                with open(
+                    self.history_filter_users_journal_path, "a", encoding="utf-8"
+                ) as journal:
+                    for username, user in history_filter_users.items():
+                        journal.write(
+                            json.dumps(
+                                {"username": username, **user}, separators=(",", ":")
+                            )
+                            + "\n"
+                        )
+                return
             with atomic_write(
                 self.history_filter_users_path, overwrite=True, encoding="utf-8"
             ) as outfile:
-                json.dump(self.history_filter_users, outfile, indent=4, sort_keys=False)
+                json.dump(history_filter_users, outfile, indent=4, sort_keys=False)
+            if os.path.isfile(self.history_filter_users_journal_path):
+                os.remove(self.history_filter_users_journal_path)
+
+    def _iter_filter_history_journal(self):
+        with open(self.history_filter_users_journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    user = json.loads(line)
+                except ValueError:
+                    logger.debug(f"Skipping corrupted line in {journal.name}.")
+                    continue
+                yield user.pop("username"), user
+
+    def get_filter_user(self, username):
+        """the last filter result saved for that user, None if never checked"""
+        with self.filter_history_lock:
+            user = self.history_filter_users.get(username)
+        if user is not None or not self.lazy:
+            return user
+        # lazy mode: the newest records are in the journal, the oldest in the json file
+        self.flush_filter_history()
+        if os.path.isfile(self.history_filter_users_journal_path):
+            for journal_username, journal_user in self._iter_filter_history_journal():
+                if journal_username == username:
+                    user = journal_user
+        if user is None and os.path.isfile(self.history_filter_users_path):
+            with open(self.history_filter_users_path, encoding="utf-8") as json_file:
+                for json_username, json_user in iter_json_object(json_file):
+                    if json_username == username:
+                        user = json_user
+        return user
 
     def add_interacted_user(
         self,
@@ -160,63 +872,40 @@ class Storage:
         job_name=None,
         target=None,
     ):
-        user = self.interacted_users.get(username, {})
-        user[USER_LAST_INTERACTION] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-
-        if followed:
-            if is_requested:
-                user[USER_FOLLOWING_STATUS] = FollowingStatus.REQUESTED.name.casefold()
-            else:
-                user[USER_FOLLOWING_STATUS] = FollowingStatus.FOLLOWED.name.casefold()
-        elif unfollowed:
-            user[USER_FOLLOWING_STATUS] = FollowingStatus.UNFOLLOWED.name.casefold()
-        elif scraped:
-            user[USER_FOLLOWING_STATUS] = FollowingStatus.SCRAPED.name.casefold()
+        user = self.interacted_users.get(username)
+        previous = None if user is None else user.last_interaction
+        if user is None:
+            user = self.interacted_users[username] = InteractedUser()
+        user.add_interaction(
+            session_id,
+            followed=followed,
+            is_requested=is_requested,
+            unfollowed=unfollowed,
+            scraped=scraped,
+            liked=liked,
+            watched=watched,
+            commented=commented,
+            pm_sent=pm_sent,
+            job_name=job_name,
+            target=target,
+        )
+        self.interaction_counters.add_interaction(
+            followed,
+            unfollowed,
+            liked,
+            pm_sent,
+            previous,
+            user.last_interaction,
+            session_id,
+        )
+        if self.journal:
+            # the counters are saved by the compaction, the journal is replayed in them
+            self._append_to_journal(username, user)
         else:
-            user[USER_FOLLOWING_STATUS] = FollowingStatus.NONE.name.casefold()
-
-        # Save only the last session_id
-        user["session_id"] = session_id
-
-        # Save only the last job_name and target
-        if not user.get("job_name"):
-            user["job_name"] = job_name
-        if not user.get("target"):
-            user["target"] = target
-
-        # Increase the value of liked, watched or commented if we have already a value
-        user["liked"] = liked if "liked" not in user else (user["liked"] + liked)
-        user["watched"] = (
-            watched if "watched" not in user else (user["watched"] + watched)
-        )
-        user["commented"] = (
-            commented if "commented" not in user else (user["commented"] + commented)
-        )
-
-        # Update the followed or unfollowed boolean only if we have a real update
-        user["followed"] = (
-            followed
-            if "followed" not in user or user["followed"] != followed
-            else user["followed"]
-        )
-        user["unfollowed"] = (
-            unfollowed
-            if "unfollowed" not in user or user["unfollowed"] != unfollowed
-            else user["unfollowed"]
-        )
-        user["scraped"] = (
-            scraped
-            if "scraped" not in user or user["scraped"] != scraped
-            else user["scraped"]
-        )
-        # Save the boolean if we sent a PM
-        user["pm_sent"] = (
-            pm_sent
-            if "pm_sent" not in user or user["pm_sent"] != pm_sent
-            else user["pm_sent"]
-        )
-        self.interacted_users[username] = user
-        self._update_file()
+            self._update_file()
+            self.interaction_counters.save()
+        if self.shared_storage is not None:
+            self.shared_storage.add_interacted_user(username)
 
     def is_user_in_whitelist(self, username):
         return username in self.whitelist
@@ -225,23 +914,199 @@ class Storage:
         return username in self.blacklist
 
     def _get_last_day_interactions_count(self):
-        count = 0
-        users_list = list(self.interacted_users.values())
-        for user in users_list:
-            last_interaction = datetime.strptime(
-                user[USER_LAST_INTERACTION], "%Y-%m-%d %H:%M:%S.%f"
-            )
-            is_last_day = datetime.now() - last_interaction <= timedelta(days=1)
-            if is_last_day:
-                count += 1
-        return count
+        """users interacted in the last 24h, each one counted once"""
+        return self.interaction_counters.count("users", hours=24)
 
     def _update_file(self):
         if self.interacted_users_path is not None:
             with atomic_write(
                 self.interacted_users_path, overwrite=True, encoding="utf-8"
             ) as outfile:
-                json.dump(self.interacted_users, outfile, indent=4, sort_keys=False)
+                json.dump(
+                    self.interacted_users,
+                    outfile,
+                    indent=4,
+                    sort_keys=False,
+                    default=InteractedUser.to_dict,
+                )
+
+    def _replay_journal(self):
+        """apply the interactions appended to the journal after the last compaction"""
+        if not os.path.isfile(self.interacted_users_journal_path):
+            return
+        with open(self.interacted_users_journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    user = json.loads(line)
+                except ValueError:
+                    # a hard kill while appending leaves a truncated last line
+                    logger.debug(f"Skipping corrupted line in {journal.name}.")
+                    continue
+                username = user.pop("username")
+                user = InteractedUser.from_dict(user)
+                previous = self.interacted_users.get(username)
+                if user.last_interaction > self.interaction_counters.last_interaction:
+                    # appended after the last save of the counters
+                    self.interaction_counters.add_interaction(
+                        user.followed,
+                        user.unfollowed,
+                        user.liked - (0 if previous is None else previous.liked),
+                        user.pm_sent,
+                        None if previous is None else previous.last_interaction,
+                        user.last_interaction,
+                        user.session_id,
+                    )
+                self.interacted_users[username] = user
+                self.journal_entries += 1
+        if self.journal_entries > 0:
+            logger.debug(
+                f"Replayed {self.journal_entries} interaction(s) from {self.interacted_users_journal_path}."
+            )
+
+    def _append_to_journal(self, username, user):
+        with open(self.interacted_users_journal_path, "a", encoding="utf-8") as journal:
+            journal.write(
+                json.dumps(
+                    {"username": username, **user.to_dict()}, separators=(",", ":")
+                )
+                + "\n"
+            )
+        self.journal_entries += 1
+        if self.journal_entries >= JOURNAL_COMPACT_THRESHOLD:
+            self.compact_journal()
+
+    def compact_journal(self):
+        """write the whole interacted users in the json file and empty the journal"""
+        self._update_file()
+        self.interaction_counters.save()
+        # the journal is removed only after the json file and the counters have been replaced
+        # so a crash between the two steps will just replay the same records again
+        if os.path.isfile(self.interacted_users_journal_path):
+            os.remove(self.interacted_users_journal_path)
+        self.journal_entries = 0
+
+    def _archive_file(self, name, now):
+        return os.path.join(
+            self.account_path,
+            ARCHIVE,
+            f"{name}-{now.strftime('%Y%m%d-%H%M%S')}.jsonl.gz",
+        )
+
+    def archive(self, max_age_days):
+        """
+        move the records older than max_age_days in gzipped json lines under archive/
+        and rewrite the live files, the users we're still following are kept for the unfollow jobs
+        returns how many interacted and filtered users have been archived
+        """
+        now = datetime.now()
+        since = now - timedelta(days=max_age_days)
+        since_epoch = to_epoch(since)
+        interacted_archive = ColdArchive(self._archive_file("interacted_users", now))
+        for username, user in list(self.interacted_users.items()):
+            if user.last_interaction < since_epoch and user.following_status not in (
+                FollowingStatus.FOLLOWED,
+                FollowingStatus.REQUESTED,
+            ):
+                interacted_archive.add(username, user.to_dict())
+                del self.interacted_users[username]
+        interacted_archive.close()
+        if interacted_archive.count > 0:
+            # the archive is closed before rewriting, so a crash can only duplicate records
+            self.compact_journal()
+
+        filter_archive = ColdArchive(self._archive_file("history_filters_users", now))
+        try:
+            self._archive_filter_history(str(since), filter_archive)
+        finally:
+            filter_archive.close()
+        logger.info(
+            f"Archived {interacted_archive.count} interacted user(s) and {filter_archive.count} filtered user(s) older than {max_age_days} day(s) in {os.path.join(self.account_path, ARCHIVE)}."
+        )
+        return interacted_archive.count, filter_archive.count
+
+    def _archive_filter_history(self, since, filter_archive):
+        def is_old(user):
+            # records without a datetime are kept, we can't say how old they are
+            return user.get("datetime") is not None and user["datetime"] < since
+
+        self.flush_filter_history()
+        with self.filter_history_write_lock:
+            if not self._has_filter_records(is_old):
+                # nothing to move, don't rewrite the files for nothing
+                return
+            # the files are streamed, so this works in lazy mode too
+            if os.path.isfile(self.history_filter_users_path):
+                with atomic_write(
+                    self.history_filter_users_path, overwrite=True, encoding="utf-8"
+                ) as outfile, open(
+                    self.history_filter_users_path, encoding="utf-8"
+                ) as json_file:
+                    write_json_object(
+                        outfile,
+                        (
+                            (username, compact_filter_record(user))
+                            for username, user in filter_archive.split(
+                                iter_json_object(json_file), is_old
+                            )
+                        ),
+                    )
+            if os.path.isfile(self.history_filter_users_journal_path):
+                records = list(
+                    filter_archive.split(self._iter_filter_history_journal(), is_old)
+                )
+                with atomic_write(
+                    self.history_filter_users_journal_path,
+                    overwrite=True,
+                    encoding="utf-8",
+                ) as journal:
+                    for username, user in records:
+                        journal.write(
+                            json.dumps(
+                                {"username": username, **compact_filter_record(user)},
+                                separators=(",", ":"),
+                            )
+                            + "\n"
+                        )
+            with self.filter_history_lock:
+                self.history_filter_users = {
+                    username: compact_filter_record(user)
+                    for username, user in self.history_filter_users.items()
+                    if not is_old(user)
+                }
+
+    def _has_filter_records(self, condition):
+        if not self.lazy:
+            # the json file and the journal are loaded in memory
+            with self.filter_history_lock:
+                return any(
+                    condition(user) for user in self.history_filter_users.values()
+                )
+        if os.path.isfile(self.history_filter_users_path):
+            with open(self.history_filter_users_path, encoding="utf-8") as json_file:
+                if any(condition(user) for _, user in iter_json_object(json_file)):
+                    return True
+        return os.path.isfile(self.history_filter_users_journal_path) and any(
+            condition(user) for _, user in self._iter_filter_history_journal()
+        )
+
+    def flush(self):
+        self.flush_filter_history()
+        self.interaction_counters.save()
+        if self.journal and self.journal_entries > 0:
+            self.compact_journal()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        _open_storages.discard(self)
+        self.filter_history_event.set()
+        if self.filter_history_writer is not None:
+            self.filter_history_writer.join()
+        self.flush()
+        if self.shared_storage is not None:
+            self.shared_storage.close()
 
 
 @unique
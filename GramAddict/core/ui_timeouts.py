@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+
+from atomicwrites import atomic_write
+
+from GramAddict.core.storage import ACCOUNTS
+
+logger = logging.getLogger(__name__)
+
+FILENAME_UI_TIMEOUTS = "ui_timeouts.json"
+# waits of a selector we need before trusting its stats
+MIN_SAMPLES = 10
+# one wait out of them uses the full timeout, so slower appearances are still seen
+EXPLORE_EVERY = 20
+# latencies kept for every selector
+MAX_LATENCIES = 100
+# the learned timeout is the p99 of the appearances times this
+MARGIN = 1.5
+MIN_TIMEOUT = 0.5
+# below this hit rate an element is considered almost never there
+RARE_HIT_RATE = 0.02
+SAVE_EVERY = 25
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class UiTimeouts:
+    """
+    How long the selectors of this device take to appear, and how often they do.
+    The waits for an element are shortened to what it really takes on this device,
+    the ones for an element that's almost never there end quickly.
+    """
+
+    def __init__(self, serial, path=None):
+        self.serial = serial
+        self.path = (
+            os.path.join(ACCOUNTS, FILENAME_UI_TIMEOUTS) if path is None else path
+        )
+        self.devices = {}
+        self.unsaved = 0
+        if os.path.isfile(self.path):
+            with open(self.path, encoding="utf-8") as json_file:
+                try:
+                    self.devices = json.load(json_file)
+                except Exception as e:
+                    logger.error(
+                        f"Please check {json_file.name}, it contains this error: {e}. UI timeouts will be learned again."
+                    )
+        self.selectors = self.devices.setdefault(str(serial), {})
+
+    def get(self, selector, default):
+        """seconds to wait for selector, default is the one of the Timeout asked"""
+        stats = self.selectors.get(selector)
+        if (
+            selector is None
+            or not default
+            or stats is None
+            or stats["waits"] < MIN_SAMPLES
+            or stats["waits"] % EXPLORE_EVERY == 0
+        ):
+            return default
+        if not stats["latencies"] or stats["hits"] / stats["waits"] < RARE_HIT_RATE:
+            return min(default, MIN_TIMEOUT)
+        learned = max(MIN_TIMEOUT, percentile(stats["latencies"], 99) * MARGIN)
+        return min(default, learned)
+
+    def record(self, selector, elapsed, found):
+        if selector is None:
+            return
+        stats = self.selectors.setdefault(
+            selector, {"waits": 0, "hits": 0, "latencies": []}
+        )
+        stats["waits"] += 1
+        if found:
+            stats["hits"] += 1
+            stats["latencies"] = stats["latencies"][-(MAX_LATENCIES - 1) :] + [
+                round(elapsed, 3)
+            ]
+        self.unsaved += 1
+        if self.unsaved >= SAVE_EVERY:
+            self.save()
+
+    def save(self):
+        if not self.unsaved:
+            return
+        if not os.path.exists(os.path.dirname(self.path) or "."):
+            os.makedirs(os.path.dirname(self.path))
+        # another bot could have saved the stats of its device in the meantime
+        if os.path.isfile(self.path):
+            with open(self.path, encoding="utf-8") as json_file:
+                try:
+                    self.devices = json.load(json_file)
+                except ValueError:
+                    pass
+        self.devices[str(self.serial)] = self.selectors
+        with atomic_write(self.path, overwrite=True, encoding="utf-8") as outfile:
+            json.dump(self.devices, outfile)
+        self.unsaved = 0
@@ -1,7 +1,6 @@
 import logging
 import os
 import random
-import re
 import shutil
 import subprocess
 import sys
@@ -12,7 +11,6 @@ from math import nan
 from os import getcwd, rename, walk
 from pathlib import Path
 from random import randint, shuffle, uniform
-from subprocess import PIPE
 from time import sleep
 from typing import Optional, Tuple, Union
 from urllib.parse import urlparse
@@ -25,11 +23,13 @@ from colorama import Fore, Style
 from packaging.version import parse as parse_version
 
 from GramAddict import __file__, __version__
+from GramAddict.core.adb import get_adb_shell
 from GramAddict.core.config import Config
 from GramAddict.core.log import get_log_file_config
-from GramAddict.core.report import print_full_report
+from GramAddict.core.report import print_full_report, print_rpc_report
 from GramAddict.core.resources import ResourceID as resources
-from GramAddict.core.storage import ACCOUNTS
+from GramAddict.core.rpc_stats import RPC_STATS
+from GramAddict.core.storage import ACCOUNTS, flush_storages
 
 http = urllib3.PoolManager()
 logger = logging.getLogger(__name__)
@@ -148,13 +148,7 @@ def config_examples():
 
 def check_adb_connection():
     is_device_id_provided = configs.device_id is not None
-    # sometimes it needs two requests to wake up...
-    stream = os.popen("adb devices")
-    stream.close()
-    stream = os.popen("adb devices")
-    output = stream.read()
-    devices_count = len(re.findall("device\n", output))
-    stream.close()
+    devices_count = get_adb_shell(configs.device_id).devices_count()
 
     is_ok = True
     message = "That's ok."
@@ -174,71 +168,53 @@ def check_adb_connection():
 
 
 def get_instagram_version():
-    stream = os.popen(
-        f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell dumpsys package {app_id}"
-    )
-    output = stream.read()
-    version_match = re.findall("versionName=(\\S+)", output)
-    version = version_match[0] if len(version_match) == 1 else "not found"
-    stream.close()
-    return version
+    return get_adb_shell(configs.device_id).package_version(app_id) or "not found"
 
 
 def open_instagram_with_url(url) -> bool:
     logger.info(f"Open Instagram app with url: {url}")
-    cmd = f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell am start -a android.intent.action.VIEW -d {url}"
-    cmd_res = subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
-    err = cmd_res.stderr.strip()
+    opened = get_adb_shell(configs.device_id).open_url(url)
     random_sleep()
-    if err:
-        logger.debug(err)
-        return False
-    return True
+    return opened
 
 
 def kill_app(device, app_id):
     device.deviceV2.app_stop(app_id)
+    device.screen_changed()
 
 
 def head_up_notifications(enabled: bool = False):
     """
     Enable or disable head-up-notifications
     """
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell settings put global heads_up_notifications_enabled {0 if not enabled else 1}"
+    return get_adb_shell(configs.device_id).put_setting(
+        "global", "heads_up_notifications_enabled", 1 if enabled else 0
     )
-    return subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
 
 
 def check_screen_timeout():
     MIN_TIMEOUT = 5 * 6_000
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else f' -s {configs.device_id}'} shell settings get system screen_off_timeout"
-    )
-    resp = subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
+    adb_shell = get_adb_shell(configs.device_id)
+    screen_timeout = adb_shell.get_setting("system", "screen_off_timeout")
     try:
-        if int(resp.stdout.lstrip()) < MIN_TIMEOUT:
+        if int(screen_timeout) < MIN_TIMEOUT:
             logger.info(
                 f"Setting timeout of the screen to {MIN_TIMEOUT/6_000:.0f} minutes."
             )
-            cmd: str = (
-                f"adb{'' if configs.device_id is None else f' -s {configs.device_id}'} shell settings put system screen_off_timeout {MIN_TIMEOUT}"
-            )
-
-            subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
+            adb_shell.put_setting("system", "screen_off_timeout", MIN_TIMEOUT)
         else:
             logger.info("Screen timeout is fine!")
-    except ValueError:
+    except (TypeError, ValueError):
         logger.info("Unable to get screen timeout!")
-        logger.debug(resp.stdout)
+        logger.debug(screen_timeout)
 
 
 def open_instagram(device):
-    nl = "\n"
     FastInputIME = "com.github.uiautomator/.FastInputIME"
     logger.info("Open Instagram app.")
 
     def call_ig():
+        device.screen_changed()
         try:
             return device.deviceV2.app_start(app_id, use_monkey=True)
         except uiautomator2.exceptions.BaseError as exc:
@@ -273,34 +249,27 @@ def open_instagram(device):
     if configs.args.close_apps:
         logger.info("Close all the other apps, to avoid interferences...")
         device.deviceV2.app_stop_all(excludes=[app_id])
+        device.screen_changed()
         random_sleep()
     logger.debug("Setting FastInputIME as default keyboard.")
     device.deviceV2.set_fastinput_ime(True)
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell settings get secure default_input_method"
-    )
-    cmd_res = subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
-    if cmd_res.stdout.replace(nl, "") != FastInputIME:
+    default_ime = device.adb.get_setting("secure", "default_input_method")
+    if default_ime != FastInputIME:
         logger.warning(
-            f"FastInputIME is not the default keyboard! Default is: {cmd_res.stdout.replace(nl, '')}. Changing it via adb.."
-        )
-        cmd: str = (
-            f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell ime set {FastInputIME}"
+            f"FastInputIME is not the default keyboard! Default is: {default_ime}. Changing it via adb.."
         )
-        cmd_res = subprocess.run(
-            cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8"
-        )
-        if cmd_res.stdout.startswith("Error:"):
-            logger.warning(
-                f"{cmd_res.stdout.replace(nl, '')}. It looks like you don't have FastInputIME installed :S"
-            )
+        if not device.adb.set_ime(FastInputIME):
+            logger.warning("It looks like you don't have FastInputIME installed :S")
         else:
             logger.info("FastInputIME is the default keyboard.")
     else:
         logger.info("FastInputIME is the default keyboard.")
     if configs.args.screen_record:
         try:
-            device.start_screenrecord()
+            device.start_screenrecord(
+                fps=int(configs.args.screen_record_fps),
+                scale=float(configs.args.screen_record_scale),
+            )
         except Exception as e:
             logger.error(
                 f"You can't use this feature without installing dependencies. Type that in console: 'pip3 install -U \"uiautomator2[image]\" -i https://pypi.doubanio.com/simple'. Exception: {e}"
@@ -308,9 +277,28 @@ def open_instagram(device):
     return True
 
 
+def save_rpc_stats(device, session_state):
+    """print the uiautomator2 calls of the session and keep them in accounts/<username>/rpc_stats"""
+    if device.rpc_stats is None or session_state is None:
+        return
+    if not device.rpc_stats.total()[0]:
+        return
+    print_rpc_report(device.rpc_stats)
+    if session_state.my_username is not None:
+        path = device.rpc_stats.save(
+            os.path.join(ACCOUNTS, session_state.my_username, RPC_STATS),
+            session_state.id,
+        )
+        logger.info(f"uiautomator2 stats saved in {path}.")
+    device.rpc_stats.reset()
+
+
 def close_instagram(device):
     logger.info("Close Instagram app.")
     device.deviceV2.app_stop(app_id)
+    if device.ui_timeouts is not None:
+        device.ui_timeouts.save()
+    device.screen_changed()
     random_sleep(5, 5, modulable=False)
     if configs.args.screen_record:
         try:
@@ -322,7 +310,7 @@ def close_instagram(device):
 
 
 def check_if_crash_popup_is_there(device) -> bool:
-    obj = device.find(resourceId=ResourceID.CRASH_POPUP)
+    obj = device.find(resourceId=ResourceID.CRASH_POPUP, check_app=False)
     if obj.exists():
         obj.click()
         return True
@@ -395,7 +383,7 @@ def countdown(seconds: int = 10, waiting_message: str = "") -> None:
 def choose_cloned_app(device) -> None:
     """if dialog box is displayed choose for original or cloned app"""
     app_number = "2" if configs.args.use_cloned_app else "1"
-    obj = device.find(resourceId=f"{ResourceID.MIUI_APP}{app_number}")
+    obj = device.find(resourceId=f"{ResourceID.MIUI_APP}{app_number}", check_app=False)
     if obj.exists(3):
         logger.debug(f"Cloned app menu exists. Pressing on app number {app_number}.")
         obj.click()
@@ -427,30 +415,12 @@ def print_telegram_reports(
 
 def kill_atx_agent(device):
     _restore_keyboard(device)
-    logger.info("Kill atx agent.")
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else f' -s {configs.device_id}'} shell pkill atx-agent"
-    )
-    subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
+    device.connection.kill_agent()
 
 
 def restart_atx_agent(device):
-    kill_atx_agent(device)
-    logger.info("Restarting atx agent.")
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else f' -s {configs.device_id}'} shell /data/local/tmp/atx-agent server -d"
-    )
-
-    try:
-        result = subprocess.run(
-            cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8", check=True
-        )
-        if result.returncode != 0:
-            logger.error(f"Failed to restart atx-agent: {result.stderr}")
-        else:
-            logger.info("atx-agent restarted successfully.")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error occurred while restarting atx-agent: {e}")
+    _restore_keyboard(device)
+    device.connection.restart_agent()
 
 
 def _restore_keyboard(device):
@@ -518,7 +488,10 @@ def save_crash(device):
     check_if_updated(crash=True)
     if args.screen_record:
         try:
-            device.start_screenrecord()
+            device.start_screenrecord(
+                fps=int(args.screen_record_fps),
+                scale=float(args.screen_record_scale),
+            )
         except Exception as e:
             logger.error(
                 f"You can't use this feature without installing dependencies. Type that in console: 'pip3 install -U \"uiautomator2[image]\" -i https://pypi.doubanio.com/simple'. Exception: {e}"
@@ -542,6 +515,7 @@ def trim_txt(source: str, target: str) -> None:
 
 
 def stop_bot(device, sessions, session_state, was_sleeping=False):
+    flush_storages()
     close_instagram(device)
     if args.kill_atx_agent:
         kill_atx_agent(device)
@@ -552,8 +526,10 @@ def stop_bot(device, sessions, session_state, was_sleeping=False):
     )
     if session_state is not None:
         print_full_report(sessions, configs.args.scrape_to_file)
+        save_rpc_stats(device, session_state)
         if not was_sleeping:
             sessions.persist(directory=session_state.my_username)
+            session_state.stop_checkpoint()
     ask_for_a_donation()
     sys.exit(2)
 
@@ -17,6 +17,7 @@ from GramAddict.core.device_facade import (
     Mode,
     SleepTime,
     Timeout,
+    on_snapshot,
 )
 from GramAddict.core.resources import ClassName
 from GramAddict.core.resources import ResourceID as resources
@@ -459,6 +460,7 @@ class PostsViewList:
         self.device = device
         self.has_tags = False
 
+    @on_snapshot
     def swipe_to_fit_posts(self, swipe: SwipeTo):
         """calculate the right swipe amount necessary to swipe to next post in hashtag post view
         in order to make it available to other plug-ins I cut it in two moves"""
@@ -693,6 +695,7 @@ class PostsViewList:
         self.has_tags = tags_icon.exists()
         return self.has_tags
 
+    @on_snapshot
     def _check_if_last_post(
         self, last_description, current_job
     ) -> Tuple[bool, str, str, bool, bool, bool]:
@@ -1407,8 +1410,10 @@ class OpenedPostView:
         return None
 
     def _getUserContainer(self):
+        # the rows are read from a dump of the screen, not one by one
         obj = self.device.find(
             resourceIdMatches=ResourceID.USER_LIST_CONTAINER,
+            snapshot=True,
         )
         return obj if obj.exists(Timeout.LONG) else None
 
@@ -1533,28 +1538,16 @@ class ProfileView(ActionBarView):
             save_crash(self.device)
             return None, None, None
 
-    def _new_ui_profile_button(self) -> bool:
-        found = False
-        buttons = self.device.find(className=ResourceID.BUTTON)
-        for button in buttons:
-            if button.get_desc() == "Profile":
-                button.click()
-                found = True
-        return found
-
-    def _old_ui_profile_button(self) -> bool:
-        found = False
-        obj = self.device.find(resourceIdMatches=ResourceID.TAB_AVATAR)
-        if obj.exists(Timeout.MEDIUM):
-            obj.click()
-            found = True
-        return found
-
     def click_on_avatar(self):
+        profile_buttons = [
+            # new ui, then old ui
+            dict(className=ResourceID.BUTTON, description="Profile"),
+            dict(resourceIdMatches=ResourceID.TAB_AVATAR),
+        ]
         while True:
-            if self._new_ui_profile_button():
-                break
-            if self._old_ui_profile_button():
+            found = self.device.wait_any(profile_buttons, Timeout.MEDIUM)
+            if found is not None:
+                self.device.find(snapshot=True, **profile_buttons[found]).click()
                 break
             self.device.back()
 
@@ -2120,19 +2113,21 @@ class UniversalActions:
         logger.debug("Checking for block...")
         if "blocked" in device.deviceV2.toast.get_message(1.0, 2.0, default=""):
             logger.warning("Toast detected!")
-        serius_block = device.find(
-            className=ClassName.IMAGE,
-            textMatches=case_insensitive_re("Force reset password icon"),
+        block = device.find_any(
+            [
+                dict(
+                    className=ClassName.IMAGE,
+                    textMatches=case_insensitive_re("Force reset password icon"),
+                ),
+                dict(resourceIdMatches=ResourceID.BLOCK_POPUP),
+            ]
         )
-        if serius_block.exists():
+        if block == 0:
             raise ActionBlockedError("Serius block detected :(")
-        block_dialog = device.find(
-            resourceIdMatches=ResourceID.BLOCK_POPUP,
-        )
         popup_body = device.find(
             resourceIdMatches=ResourceID.IGDS_HEADLINE_BODY,
         )
-        popup_appears = block_dialog.exists()
+        popup_appears = block == 1
         if popup_appears:
             if popup_body.exists():
                 regex = r".+deleted"
@@ -2171,7 +2166,7 @@ class UniversalActions:
 
     @staticmethod
     def close_keyboard(device):
-        flag = DeviceFacade(device.device_id, device.app_id)._is_keyboard_show()
+        flag = device._is_keyboard_show()
         if flag:
             logger.debug("The keyboard is currently open. Press back to close.")
             device.back()
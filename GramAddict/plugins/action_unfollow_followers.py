@@ -5,6 +5,11 @@ from colorama import Fore
 
 from GramAddict.core.decorators import run_safely
 from GramAddict.core.device_facade import DeviceFacade, Timeout
+from GramAddict.core.handle_sources import (
+    forget_list_position,
+    remember_list_position,
+    resume_list,
+)
 from GramAddict.core.plugin_loader import Plugin
 from GramAddict.core.resources import ClassName
 from GramAddict.core.resources import ResourceID as resources
@@ -289,6 +294,14 @@ class ActionUnfollowFollowers(Plugin):
                     device, self.args.sort_followers_newest_to_oldest
                 )
                 sorted = True
+        resume_list(
+            self,
+            storage,
+            job_name,
+            my_username,
+            lambda: device.find(resourceId=self.ResourceID.LIST).scroll(Direction.DOWN),
+            lambda username: device.find(text=username, snapshot=True).exists(),
+        )
         checked = {}
         unfollowed_count = 0
         total_unfollows_limit_reached = False
@@ -414,6 +427,9 @@ class ActionUnfollowFollowers(Plugin):
                     resourceId=self.ResourceID.LIST,
                 )
                 list_view.scroll(Direction.DOWN)
+                remember_list_position(
+                    self, storage, job_name, my_username, screen_iterated_followings
+                )
             else:
                 load_more_button = device.find(
                     resourceId=self.ResourceID.ROW_LOAD_MORE_BUTTON
@@ -427,11 +443,15 @@ class ActionUnfollowFollowers(Plugin):
                         )
                         return
                     list_view.scroll(Direction.DOWN)
+                    remember_list_position(
+                        self, storage, job_name, my_username, screen_iterated_followings
+                    )
                 else:
                     logger.info(
                         "Reached the following list end, finish.",
                         extra={"color": f"{Fore.GREEN}"},
                     )
+                    forget_list_position(self, storage, job_name, my_username)
                     return
 
     def do_unfollow(
@@ -80,6 +80,62 @@ class CoreArguments(Plugin):
                 "metavar": "1000",
                 "default": "1000",
             },
+            {
+                "arg": "--daily-likes-limit",
+                "nargs": None,
+                "help": "limit on likes in the last 24 hours, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "500",
+                "default": None,
+            },
+            {
+                "arg": "--daily-follows-limit",
+                "nargs": None,
+                "help": "limit on follows in the last 24 hours, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "150",
+                "default": None,
+            },
+            {
+                "arg": "--daily-unfollows-limit",
+                "nargs": None,
+                "help": "limit on unfollows in the last 24 hours, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "150",
+                "default": None,
+            },
+            {
+                "arg": "--daily-pm-limit",
+                "nargs": None,
+                "help": "limit on private messages in the last 24 hours, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "30",
+                "default": None,
+            },
+            {
+                "arg": "--weekly-likes-limit",
+                "nargs": None,
+                "help": "limit on likes in the last 7 days, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "2500",
+                "default": None,
+            },
+            {
+                "arg": "--weekly-follows-limit",
+                "nargs": None,
+                "help": "limit on follows in the last 7 days, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "750",
+                "default": None,
+            },
+            {
+                "arg": "--weekly-unfollows-limit",
+                "nargs": None,
+                "help": "limit on unfollows in the last 7 days, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "750",
+                "default": None,
+            },
+            {
+                "arg": "--weekly-pm-limit",
+                "nargs": None,
+                "help": "limit on private messages in the last 7 days, across sessions. The session limit is lowered by what has already been done. Disabled by default",
+                "metavar": "150",
+                "default": None,
+            },
             {
                 "arg": "--stories-count",
                 "nargs": None,
@@ -200,6 +256,27 @@ class CoreArguments(Plugin):
                 "help": "enable screen recording for debugging",
                 "action": "store_true",
             },
+            {
+                "arg": "--screen-record-fps",
+                "nargs": None,
+                "help": "frames per second of the screen recording, 10 by default",
+                "metavar": "10",
+                "default": "10",
+            },
+            {
+                "arg": "--screen-record-scale",
+                "nargs": None,
+                "help": "size of the recorded frames compared to the screen, 0.5 by default",
+                "metavar": "0.5",
+                "default": "0.5",
+            },
+            {
+                "arg": "--record-screens",
+                "nargs": None,
+                "help": "save the screen (hierarchy, screenshot and device info) before every action in this folder, it can be replayed offline",
+                "metavar": "recordings/session",
+                "default": None,
+            },
             {
                 "arg": "--close-apps",
                 "help": "close all apps except IG, to avoid interference",
@@ -215,6 +292,16 @@ class CoreArguments(Plugin):
                 "help": "restart atx-agent before the script starts",
                 "action": "store_true",
             },
+            {
+                "arg": "--adaptive-ui-timeouts",
+                "help": "learn how long the elements take to appear on this device and wait for them only that long, the stats are kept in accounts/ui_timeouts.json",
+                "action": "store_true",
+            },
+            {
+                "arg": "--rpc-stats",
+                "help": "time every uiautomator2 call, a report is printed at the end of the session and saved in accounts/<username>/rpc_stats",
+                "action": "store_true",
+            },
             {
                 "arg": "--interact",
                 "nargs": "+",
@@ -403,6 +490,37 @@ class CoreArguments(Plugin):
                 "help": "instead of typing you can paste the text as in old versions",
                 "action": "store_true",
             },
+            {
+                "arg": "--storage-engine",
+                "nargs": None,
+                "help": "how the interacted users are saved: 'json' rewrites interacted_users.json after every interaction, 'journal' appends one line per interaction to interacted_users.jsonl and merges it at the end of the session, 'sqlite' keeps everything in an indexed storage.db (the json files are imported the first time). json by default",
+                "metavar": "journal",
+                "default": "json",
+            },
+            {
+                "arg": "--lazy-storage",
+                "help": "stream interacted_users.json at startup and don't load history_filters_users.json at all, new filter results are appended to history_filters_users.jsonl. Useful with big histories",
+                "action": "store_true",
+            },
+            {
+                "arg": "--resume-lists",
+                "help": "remember how far the bot went in the followers/followings/unfollow lists and in the posts of each source, next time it scrolls straight there without reading the rows in between",
+                "action": "store_true",
+            },
+            {
+                "arg": "--shared-storage",
+                "nargs": None,
+                "help": "share accounts/shared_storage.db with the other accounts running on this host and skip the users that one of them rejected with its filters or interacted in the last hours (e.g. 24 or 12-48). Disabled by default",
+                "metavar": "24",
+                "default": None,
+            },
+            {
+                "arg": "--archive-older-than",
+                "nargs": None,
+                "help": "at the end of every session move the interacted users (except the followed ones) and the filter results older than these days in a compressed archive, like 'gramaddict compact' does. Disabled by default",
+                "metavar": "90",
+                "default": None,
+            },
             {
                 "arg": "--allow-untested-ig-version",
                 "help": "don't ask the user to press enter to continue with an untested IG version",
@@ -1,4 +1,3 @@
-import json
 import logging
 from datetime import datetime
 from typing import Optional
@@ -7,18 +6,17 @@ import requests
 import yaml
 from colorama import Fore, Style
 
+from GramAddict.core.persistent_list import read_persistent_list
 from GramAddict.core.plugin_loader import Plugin
 
 logger = logging.getLogger(__name__)
 
 
 def load_sessions(username) -> Optional[dict]:
-    try:
-        with open(f"accounts/{username}/sessions.json") as json_data:
-            return json.load(json_data)
-    except FileNotFoundError:
+    sessions = read_persistent_list(username, "sessions")
+    if sessions is None:
         logger.error("No session data found. Skipping report generation.")
-        return None
+    return sessions
 
 
 def load_telegram_config(username) -> Optional[dict]:
@@ -0,0 +1,291 @@
+"""
+Measures how the storage behaves with big account histories.
+
+Synthetic interacted_users.json, history_filters_users.json, blacklist.txt and
+sessions.json are generated for every size, then each storage engine is timed on
+a fresh copy of them. It uses the installed GramAddict, so run `pip install -e .`
+in your clone to measure your changes:
+
+    python extra/storage-benchmark/storage_benchmark.py --users 10000 100000 1000000
+
+Peak memory is measured by tracemalloc on a second load, so the page cache of
+sqlite (allocated by the C library) isn't counted.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from GramAddict.core.persistent_list import PersistentList
+from GramAddict.core.session_state import SessionState, SessionStateEncoder
+from GramAddict.core.storage import (
+    ACCOUNTS,
+    FILENAME_BLACKLIST,
+    FILENAME_HISTORY_FILTER_USERS,
+    FILENAME_INTERACTED_USERS,
+    create_storage,
+    write_json_object,
+)
+
+logger = logging.getLogger("storage-benchmark")
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s] %(name)-12s ==> %(message)s",
+    datefmt="%m/%d %H:%M:%S",
+)
+
+USERNAME = "benchmark"
+JOBS = ("blogger-followers", "hashtag-likers-top", "feed", "unfollow")
+FOLLOWING_STATUSES = ("none", "followed", "requested", "unfollowed", "scraped")
+SKIP_REASONS = (
+    None,
+    "IS_PRIVATE",
+    "LT_FOLLOWERS",
+    "GT_FOLLOWINGS",
+    "BIOGRAPHY_LANGUAGE",
+)
+
+
+def username(n):
+    return f"user_{n:07d}"
+
+
+def random_datetime(days=60):
+    return datetime.now() - timedelta(seconds=random.randint(0, days * 24 * 3600))
+
+
+def interacted_user():
+    status = random.choice(FOLLOWING_STATUSES)
+    return {
+        "last_interaction": str(random_datetime()),
+        "following_status": status,
+        "session_id": str(uuid.uuid4()),
+        "job_name": random.choice(JOBS),
+        "target": username(random.randint(0, 999)),
+        "liked": random.randint(0, 3),
+        "watched": random.randint(0, 5),
+        "commented": random.randint(0, 1),
+        "followed": status in ("followed", "requested"),
+        "unfollowed": status == "unfollowed",
+        "scraped": status == "scraped",
+        "pm_sent": False,
+    }
+
+
+def filtered_user():
+    followers = random.randint(0, 20000)
+    followings = random.randint(0, 7500)
+    return {
+        "datetime": str(random_datetime()),
+        "followers": followers,
+        "followings": followings,
+        "mutual_friends": random.randint(0, 10),
+        "follow_button_text": "FOLLOW",
+        "is_restricted": False,
+        "is_private": random.random() < 0.3,
+        "has_business_category": random.random() < 0.2,
+        "posts_count": random.randint(0, 2000),
+        "biography": "photography | travel | coffee lover, dm for collabs " * 2,
+        "link_in_bio": "linktr.ee/someone",
+        "fullname": "Some Body",
+        "potency_ratio": round(followers / followings, 2) if followings else None,
+        "skip_reason": random.choice(SKIP_REASONS),
+    }
+
+
+def session(n):
+    start = random_datetime(days=365)
+    return {
+        "id": str(uuid.uuid4()),
+        "total_interactions": random.randint(0, 200),
+        "successful_interactions": random.randint(0, 100),
+        "total_followed": random.randint(0, 50),
+        "total_likes": random.randint(0, 300),
+        "total_comments": 0,
+        "total_pm": 0,
+        "total_watched": random.randint(0, 100),
+        "total_unfollowed": random.randint(0, 50),
+        "total_scraped": {},
+        "start_time": str(start),
+        "finish_time": str(start + timedelta(hours=1)),
+        "args": {"username": USERNAME},
+        "profile": {"posts": 10, "followers": 1000 + n, "following": 500},
+    }
+
+
+def generate_account(path, users, sessions):
+    os.makedirs(path)
+    with open(os.path.join(path, FILENAME_INTERACTED_USERS), "w") as outfile:
+        write_json_object(
+            outfile, ((username(n), interacted_user()) for n in range(users))
+        )
+    # half of the filtered users have never been interacted
+    with open(os.path.join(path, FILENAME_HISTORY_FILTER_USERS), "w") as outfile:
+        write_json_object(
+            outfile,
+            ((username(n), filtered_user()) for n in range(users // 2, users * 3 // 2)),
+        )
+    with open(os.path.join(path, FILENAME_BLACKLIST), "w") as outfile:
+        outfile.write("shop_*\n*_official\n")
+        for n in random.sample(range(users * 2), users // 10):
+            outfile.write(f"{username(n)}\n")
+    with open(os.path.join(path, "sessions.json"), "w") as outfile:
+        json.dump([session(n) for n in range(sessions)], outfile, indent=4)
+
+
+class Report:
+    def __init__(self, title):
+        self.title = title
+        self.rows = []
+        self.peak_memory = None
+
+    def time(self, operation, function, count=1):
+        start = time.perf_counter()
+        for _ in range(count):
+            function()
+        elapsed = time.perf_counter() - start
+        self.rows.append((operation, count, elapsed))
+
+    def print(self):
+        print(f"\n{self.title}")
+        print(f"{'operation':<32}{'count':>10}{'seconds':>12}{'ops/s':>14}")
+        for operation, count, elapsed in self.rows:
+            ops = f"{count / elapsed:,.0f}" if elapsed > 0 else "-"
+            print(f"{operation:<32}{count:>10}{elapsed:>12.3f}{ops:>14}")
+        if self.peak_memory is not None:
+            print(f"peak memory while loading: {self.peak_memory / 2 ** 20:,.1f} MiB")
+
+
+def benchmark_engine(engine, lazy, args, users, report):
+    lookups = [username(random.randint(0, users * 2)) for _ in range(args.lookups)]
+    storage = None
+
+    def load():
+        nonlocal storage
+        storage = create_storage(USERNAME, engine, lazy=lazy)
+
+    if engine == "sqlite":
+        report.time("import json in sqlite", load)
+        storage.close()
+    report.time("load", load)
+
+    iterator = iter(lookups)
+    report.time(
+        "check_user_was_interacted",
+        lambda: storage.check_user_was_interacted(next(iterator)),
+        len(lookups),
+    )
+    iterator = iter(lookups)
+    report.time(
+        "is_user_in_blacklist",
+        lambda: storage.is_user_in_blacklist(next(iterator)),
+        len(lookups),
+    )
+    new_users = (username(users * 2 + n) for n in range(args.writes * 2))
+    report.time(
+        "add_interacted_user",
+        lambda: storage.add_interacted_user(
+            next(new_users), session_id="benchmark", liked=1
+        ),
+        args.writes,
+    )
+    # a restricted profile has no follow button to convert
+    profile = dict(filtered_user(), is_restricted=True)
+    report.time(
+        "add_filter_user",
+        lambda: storage.add_filter_user(next(new_users), SimpleNamespace(**profile)),
+        args.writes,
+    )
+    report.time("close (flush)", storage.close)
+
+    tracemalloc.start()
+    load()
+    _, report.peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    storage.close()
+
+
+def benchmark_sessions(report):
+    sessions = PersistentList("sessions", SessionStateEncoder)
+    session_state = SessionState(SimpleNamespace(args=SimpleNamespace()))
+    session_state.my_username = USERNAME
+    session_state.finishTime = datetime.now()
+    sessions.append(session_state)
+    report.time("convert sessions.json", lambda: sessions.persist(directory=USERNAME))
+    session_state.totalLikes += 1
+    report.time("persist sessions", lambda: sessions.persist(directory=USERNAME))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="storage benchmark with synthetic histories",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--users", type=int, nargs="+", default=[10000], help="interacted users"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=1000, help="sessions in sessions.json"
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=["json", "journal", "sqlite"],
+        default=["json", "journal", "sqlite"],
+    )
+    parser.add_argument(
+        "--lazy", action="store_true", help="also run json and journal in lazy mode"
+    )
+    parser.add_argument(
+        "--lookups", type=int, default=10000, help="lookups per operation"
+    )
+    parser.add_argument(
+        "--writes",
+        type=int,
+        default=20,
+        help="writes per operation, the json engine rewrites the whole file every time",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    cases = [(engine, False) for engine in args.engines]
+    if args.lazy:
+        cases += [(engine, True) for engine in args.engines if engine != "sqlite"]
+
+    workdir = tempfile.mkdtemp(prefix="gramaddict-benchmark-")
+    cwd = os.getcwd()
+    try:
+        for users in args.users:
+            template = os.path.join(workdir, f"template-{users}")
+            logger.info(f"Generating {users} users in {template}.")
+            generate_account(template, users, args.sessions)
+            for engine, lazy in cases:
+                run_path = os.path.join(workdir, f"{engine}-{lazy}-{users}")
+                shutil.copytree(template, os.path.join(run_path, ACCOUNTS, USERNAME))
+                os.chdir(run_path)
+                report = Report(
+                    f"{engine}{' lazy' if lazy else ''} engine, {users} users"
+                )
+                logger.info(f"Running {report.title}.")
+                benchmark_engine(engine, lazy, args, users, report)
+                benchmark_sessions(report)
+                report.print()
+                os.chdir(cwd)
+                shutil.rmtree(run_path)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
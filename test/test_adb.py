@@ -0,0 +1,27 @@
+from adbutils import AdbError
+
+from GramAddict.core import adb
+from GramAddict.core.adb import AdbShell
+
+
+def test_adb_shell_parses_the_outputs(mocker):
+    client = mocker.patch.object(adb, "adb")
+    shell = client.device.return_value.shell
+    adb_shell = AdbShell("serial")
+
+    shell.return_value = "  mInputShown=true mShowRequested=false\n"
+    assert adb_shell.dumpsys_flag("input_method", "mInputShown") is True
+    assert adb_shell.dumpsys_flag("input_method", "mDreamingLockscreen") is None
+    shell.return_value = "    versionCode=123 minSdk=24\n    versionName=300.0.0.1\n"
+    assert adb_shell.package_version("com.instagram.android") == "300.0.0.1"
+    shell.return_value = "Error: Unknown input method x"
+    assert not adb_shell.set_ime("x")
+
+    shell.side_effect = AdbError("device offline")
+    assert adb_shell.get_setting("system", "screen_off_timeout") is None
+    assert client.device.call_count == 1
+    shell.side_effect = None
+    shell.return_value = "60000"
+    assert adb_shell.get_setting("system", "screen_off_timeout") == "60000"
+    # reconnected after the error
+    assert client.device.call_count == 2
@@ -0,0 +1,161 @@
+import pytest
+
+from GramAddict.core import device_connection, device_facade
+from GramAddict.core.device_facade import DeviceFacade, Mode, Timeout, plan_typing
+
+
+@pytest.fixture
+def device(mocker):
+    mocker.patch("uiautomator2.connect")
+    mocker.patch.dict(device_connection._connections, clear=True)
+    mocker.patch.object(device_facade, "random_sleep")
+    device = DeviceFacade(None, "com.instagram.android")
+    device.deviceV2.app_current.return_value = {"package": "com.instagram.android"}
+    return device
+
+
+def test_foreground_app_is_cached(device, mocker):
+    clock = mocker.patch.object(device_facade, "monotonic", return_value=100.0)
+    device.find(resourceId="a")
+    device.find(resourceId="b")
+    assert device.deviceV2.app_current.call_count == 1
+
+    device.find(resourceId="c").click()
+    device.find(resourceId="d")
+    assert device.deviceV2.app_current.call_count == 2
+
+    device.deviceV2.app_current.return_value = {"package": "com.android.launcher"}
+    clock.return_value += device_facade.FOREGROUND_APP_TTL + 1
+    with pytest.raises(DeviceFacade.AppHasCrashed):
+        device.find(resourceId="e")
+    device.find(resourceId="crash_popup", check_app=False)
+
+
+HIERARCHY = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <node index="0" text="" resource-id="com.instagram.android:id/list" class="android.widget.ListView" package="com.instagram.android" content-desc="" clickable="false" selected="false" scrollable="true" bounds="[0,200][1080,2000]">
+    <node index="0" text="" resource-id="com.instagram.android:id/row" class="android.widget.LinearLayout" package="com.instagram.android" content-desc="" clickable="true" selected="false" scrollable="false" bounds="[0,200][1080,400]">
+      <node index="0" text="first_user" resource-id="com.instagram.android:id/name" class="android.widget.TextView" package="com.instagram.android" content-desc="" clickable="false" selected="false" scrollable="false" bounds="[200,250][600,300]" />
+    </node>
+    <node index="1" text="" resource-id="com.instagram.android:id/row" class="android.widget.LinearLayout" package="com.instagram.android" content-desc="" clickable="true" selected="true" scrollable="false" bounds="[0,400][1080,600]">
+      <node index="0" text="second_user" resource-id="com.instagram.android:id/name" class="android.widget.TextView" package="com.instagram.android" content-desc="" clickable="false" selected="false" scrollable="false" bounds="[200,450][600,500]" />
+    </node>
+  </node>
+</hierarchy>"""
+
+
+def test_snapshot_resolves_selectors_on_one_dump(device):
+    device.deviceV2.dump_hierarchy.return_value = HIERARCHY
+    with device.snapshot():
+        rows = device.find(resourceIdMatches="(?i).*:id/ROW")
+        assert rows.count_items() == 2
+        names = [
+            row.child(resourceId="com.instagram.android:id/name").get_text()
+            for row in rows
+        ]
+        last_row = device.find(index=-1, resourceId="com.instagram.android:id/row")
+        assert last_row.get_selected()
+        assert last_row.get_height() == 200
+        assert not device.find(text="third_user").exists()
+    assert names == ["first_user", "second_user"]
+    assert device.deviceV2.dump_hierarchy.call_count == 1
+    device.deviceV2.assert_not_called()
+
+    last_row.click()
+    assert last_row.get_bounds()["top"] == 400
+    assert device.deviceV2.dump_hierarchy.call_count == 2
+
+
+def test_view_info_is_read_once_per_frame(device, mocker):
+    info = mocker.PropertyMock(
+        return_value={
+            "bounds": {"left": 0, "top": 10, "right": 100, "bottom": 60},
+            "text": "hello",
+        }
+    )
+    view = device.find(resourceId="a")
+    type(view.viewV2).info = info
+    assert view.get_height() == 50
+    assert view.get_text() == "hello"
+    assert view.get_bounds()["top"] == 10
+    assert info.call_count == 1
+
+    view.click()
+    assert view.get_property("text") == "hello"
+    assert info.call_count == 2
+
+
+def test_devices_share_one_connection(device, mocker):
+    other = DeviceFacade(None, "com.instagram.android")
+    assert other.deviceV2 is device.deviceV2
+
+    connection = device.connection
+    mocker.patch.object(connection, "is_alive", side_effect=[False, True])
+    assert connection.heal()
+    connection.client._prepare_atx_agent.assert_called_once()
+    connection.client.reset_uiautomator.assert_called_once()
+
+
+def test_text_is_typed_in_one_request(device):
+    text = "Nice shot, really!\nLove it"
+    chunks = plan_typing(text)
+    assert "".join(chunks) == text
+    assert "!" in chunks and "\n" in chunks and " " in chunks
+
+    field = device.find(resourceId="layout_comment_thread_edittext")
+    field.viewV2.get_text.return_value = text
+    field.set_text(text, Mode.TYPE)
+    device.deviceV2.shell.assert_called_once()
+    assert device.deviceV2.shell.call_args[0][0].count("ADB_INPUT_TEXT") > 5
+    device.deviceV2.send_keys.assert_not_called()
+    field.viewV2.set_text.assert_not_called()
+
+
+def test_wait_any_returns_the_selector_found(device, mocker):
+    mocker.patch.object(device_facade, "sleep")
+    device.deviceV2.dump_hierarchy.side_effect = [
+        "<hierarchy rotation='0'/>",
+        HIERARCHY,
+    ]
+    restricted = {"resourceId": "com.instagram.android:id/restricted_title"}
+    row = {"resourceIdMatches": ".*row", "selected": True}
+    assert device.wait_any([restricted, row], Timeout.SHORT) == 1
+    assert device.deviceV2.dump_hierarchy.call_count == 2
+
+
+def test_wait_any_sees_a_popup_shown_after_the_last_dump(device):
+    popup = {"resourceIdMatches": ".*row", "selected": True}
+    device.deviceV2.dump_hierarchy.return_value = "<hierarchy rotation='0'/>"
+    with device.snapshot():
+        assert not device.find(**popup).exists()
+    # instagram shows it by itself, we did nothing to invalidate the dump
+    device.deviceV2.dump_hierarchy.return_value = HIERARCHY
+    assert device.wait_any([popup], Timeout.ZERO) == 0
+
+
+def test_wait_any_keeps_the_frame_and_checks_unsupported_selectors(device):
+    device.deviceV2.dump_hierarchy.return_value = HIERARCHY
+    device.deviceV2.return_value.exists.return_value = False
+    device.deviceV2.return_value.count = 0
+    frame = device.frame
+    popup = {"resourceIdMatches": ".*row", "selected": True}
+    assert device.wait_any([{"text": "x", "instance": 1}, popup], Timeout.ZERO) == 1
+    device.deviceV2.assert_called_once_with(text="x", instance=1)
+    assert device.frame == frame
+
+
+def test_find_any_reuses_the_dump_of_the_frame(device):
+    device.deviceV2.return_value.exists.return_value = False
+    device.deviceV2.return_value.count = 0
+    popup = {"resourceIdMatches": ".*row", "selected": True}
+    # no dump yet: one exists() per selector
+    assert device.find_any([popup]) is None
+    device.deviceV2.dump_hierarchy.assert_not_called()
+
+    device.deviceV2.dump_hierarchy.return_value = HIERARCHY
+    with device.snapshot():
+        device.find(resourceId="com.instagram.android:id/list").exists()
+    device.deviceV2.reset_mock()
+    assert device.find_any([popup]) == 0
+    device.deviceV2.assert_not_called()
+    device.deviceV2.dump_hierarchy.assert_not_called()
@@ -0,0 +1,33 @@
+import json
+from types import SimpleNamespace
+
+from GramAddict.core.persistent_list import PersistentList, read_persistent_list
+
+
+class Encoder:
+    def default(self, item):
+        return {"id": item.id, "likes": item.likes}
+
+
+def test_persist_appends_changed_items(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "accounts" / "test_user").mkdir(parents=True)
+    with open(tmp_path / "accounts" / "test_user" / "sessions.json", "w") as f:
+        json.dump([{"id": "old", "likes": 1}], f)
+
+    sessions = PersistentList("sessions", Encoder)
+    session = SimpleNamespace(id="new", likes=0)
+    sessions.append(session)
+    sessions.persist(directory="test_user")
+    sessions.persist(directory="test_user")
+    session.likes = 5
+    sessions.persist(directory="test_user")
+
+    assert not (tmp_path / "accounts" / "test_user" / "sessions.json").exists()
+    with open(tmp_path / "accounts" / "test_user" / "sessions.jsonl") as f:
+        assert len(f.readlines()) == 3
+    assert read_persistent_list("test_user", "sessions") == [
+        {"id": "old", "likes": 1},
+        {"id": "new", "likes": 5},
+    ]
+    assert read_persistent_list("unknown", "sessions") is None
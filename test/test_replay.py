@@ -0,0 +1,71 @@
+import json
+
+from PIL import Image
+
+from GramAddict.core import device_facade
+from GramAddict.core.device_facade import DeviceFacade
+from GramAddict.core.replay import SCREENS, RecordingDevice
+
+FEED = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <node index="0" text="" resource-id="com.instagram.android:id/tab_bar" class="android.widget.LinearLayout" package="com.instagram.android" content-desc="" bounds="[0,2000][1080,2100]">
+    <node index="0" text="" resource-id="com.instagram.android:id/feed_tab" class="android.widget.FrameLayout" package="com.instagram.android" content-desc="Home" selected="true" bounds="[0,2000][540,2100]" />
+    <node index="1" text="" resource-id="com.instagram.android:id/profile_tab" class="android.widget.FrameLayout" package="com.instagram.android" content-desc="Profile" selected="false" bounds="[540,2000][1080,2100]" />
+  </node>
+</hierarchy>"""
+PROFILE = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <node index="0" text="justinbieber" resource-id="com.instagram.android:id/action_bar_title" class="android.widget.TextView" package="com.instagram.android" content-desc="" bounds="[0,100][1080,200]" />
+</hierarchy>"""
+INFO = {"displayWidth": 1080, "displayHeight": 2160, "sdkInt": 30}
+
+
+def write_recording(path):
+    path.mkdir()
+    with open(path / SCREENS, "w", encoding="utf-8") as screens:
+        for n, (xml, action) in enumerate(((FEED, "click"), (PROFILE, "press"))):
+            (path / f"{n}.xml").write_text(xml, encoding="utf-8")
+            screen = {
+                "hierarchy": f"{n}.xml",
+                "screenshot": {"file": f"{n}.jpg", "width": 1080, "height": 2160},
+                "info": INFO,
+                "app": "com.instagram.android",
+                "action": {"name": action, "args": []},
+            }
+            screens.write(json.dumps(screen) + "\n")
+
+
+def test_replay_follows_the_recorded_screens(tmp_path, mocker):
+    mocker.patch.object(device_facade, "random_sleep")
+    write_recording(tmp_path / "recording")
+    device = DeviceFacade(None, "com.instagram.android", replay=tmp_path / "recording")
+
+    assert device.get_info()["sdkInt"] == 30
+    profile_tab = device.find(resourceId="com.instagram.android:id/tab_bar").child(
+        descriptionMatches="Prof.*"
+    )
+    assert not profile_tab.get_selected()
+    assert not device.find(text="justinbieber").exists()
+
+    profile_tab.click()
+    assert device.find(text="justinbieber").exists()
+    assert device.find(resourceIdMatches=".*profile_tab").count_items() == 0
+
+
+def test_screens_are_recorded_before_the_actions(tmp_path, mocker):
+    client = mocker.Mock()
+    client.dump_hierarchy.return_value = FEED
+    client.screenshot.return_value = Image.new("RGB", (108, 216))
+    client.info = INFO
+    client.app_current.return_value = {"package": "com.instagram.android"}
+    recording = RecordingDevice(client, tmp_path / "recording")
+
+    recording(resourceId="com.instagram.android:id/profile_tab").click()
+    recording.press("back")
+    assert recording.info == INFO
+
+    with open(tmp_path / "recording" / SCREENS, encoding="utf-8") as screens:
+        actions = [json.loads(line)["action"]["name"] for line in screens]
+    assert actions == ["click", "press"]
+    assert (tmp_path / "recording" / "00001.xml").read_text(encoding="utf-8") == FEED
+    client.press.assert_called_once_with("back")
@@ -0,0 +1,34 @@
+import json
+
+from GramAddict.core.rpc_stats import RpcStats, measure
+
+
+def test_rpc_stats_are_kept_per_method_and_view(tmp_path):
+    rpc_stats = RpcStats()
+    for _ in range(19):
+        rpc_stats.add("exists", "resourceId=profile", 0.02)
+    rpc_stats.add("exists", "resourceId=profile", 3)
+    rpc_stats.add("click", None, 0.2)
+
+    assert rpc_stats.total() == (21, 19 * 0.02 + 3 + 0.2)
+    assert rpc_stats.percentile("exists", 95) == 0.025
+    assert rpc_stats.percentile("exists", 100) == 5
+    assert rpc_stats.top_views() == [
+        ("resourceId=profile", {"count": 20, "seconds": 19 * 0.02 + 3})
+    ]
+
+    path = rpc_stats.save(tmp_path / "rpc_stats", "session")
+    with open(path, encoding="utf-8") as json_file:
+        assert json.load(json_file)["methods"]["click"]["count"] == 1
+    rpc_stats.reset()
+    assert rpc_stats.total() == (0, 0)
+
+
+def test_measure_does_nothing_without_stats():
+    with measure(None, "exists"):
+        pass
+    rpc_stats = RpcStats()
+    with measure(rpc_stats, "exists", "text=Follow"):
+        pass
+    assert rpc_stats.methods["exists"]["count"] == 1
+    assert rpc_stats.views["text=Follow"]["count"] == 1
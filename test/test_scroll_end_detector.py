@@ -0,0 +1,21 @@
+from GramAddict.core.scroll_end_detector import ScrollEndDetector
+
+
+def iterate_page(detector, usernames):
+    detector.notify_new_page()
+    for username in usernames:
+        detector.notify_username_iterated(username)
+
+
+def test_end_is_detected_on_the_last_pages_only():
+    detector = ScrollEndDetector(repeats_to_end=3)
+    for n in range(100):
+        iterate_page(detector, [f"user{n}", f"user{n + 1}"])
+    assert len(detector.pages) == 3
+    assert not detector.is_the_end()
+
+    iterate_page(detector, ["user99", "user100"])
+    assert not detector.is_the_end()
+    iterate_page(detector, ["user99", "user100"])
+    assert detector.is_the_end()
+    assert len(ScrollEndDetector().pages) == 0
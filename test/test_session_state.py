@@ -0,0 +1,75 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from GramAddict.core.session_state import CHECKPOINT_LIMITS, SessionState
+
+
+def new_session(limit):
+    args = SimpleNamespace(**{name: limit for name in CHECKPOINT_LIMITS})
+    session_state = SessionState(SimpleNamespace(args=args))
+    session_state.my_username = "test_user"
+    return session_state
+
+
+def test_killed_session_is_resumed_the_same_day(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "accounts" / "test_user").mkdir(parents=True)
+    killed = new_session(limit=30)
+    # str() of this one has no microseconds
+    killed.startTime = killed.startTime.replace(microsecond=0)
+    killed.start_checkpoint()
+    killed.totalLikes = 12
+    killed.add_interaction("source", succeed=True, followed=True, scraped=False)
+    killed.checkpoint.save()
+
+    resumed = new_session(limit=80)
+    resumed.start_checkpoint()
+    assert resumed.id == killed.id
+    assert resumed.startTime == killed.startTime
+    assert resumed.totalLikes == 12
+    assert resumed.totalFollowed == {"source": 1}
+    assert resumed.args.current_likes_limit == 30
+    resumed.stop_checkpoint()
+    assert not (
+        tmp_path / "accounts" / "test_user" / "session_checkpoint.json"
+    ).exists()
+
+
+def test_killed_session_of_another_day_is_saved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "accounts" / "test_user").mkdir(parents=True)
+    killed = new_session(limit=30)
+    killed.startTime = datetime.now() - timedelta(days=1)
+    killed.start_checkpoint()
+
+    session_state = new_session(limit=80)
+    session_state.start_checkpoint()
+    assert session_state.id != killed.id
+    assert session_state.args.current_likes_limit == 80
+    session_state.stop_checkpoint()
+    with open(tmp_path / "accounts" / "test_user" / "sessions.jsonl") as f:
+        saved = json.loads(f.readline())
+    assert saved["id"] == killed.id
+    assert saved["finish_time"] != "None"
+
+
+def test_resumed_session_gets_back_only_its_stored_interactions(tmp_path):
+    from GramAddict.core.storage import InteractionCounters
+
+    session_state = new_session(limit=100)
+    for kind in ("likes", "follows", "unfollows", "pm"):
+        for period in ("daily", "weekly"):
+            setattr(session_state.args, f"{period}_{kind}_limit", None)
+    session_state.args.daily_likes_limit = "20"
+    # the checkpoint says 12 likes, the kill lost 8 of them before they were counted
+    session_state.totalLikes = 12
+    counters = InteractionCounters(tmp_path / "interaction_counters.json")
+    for liked in (2, 2):
+        counters.add_interaction(False, False, liked, False, session_id="other")
+    counters.add_interaction(False, False, 4, False, session_id=session_state.id)
+
+    session_state.set_rolling_limits(counters)
+    # 4 likes of the other session and 12 of this one: it can do 4 more
+    assert session_state.args.current_likes_limit == 16
+    assert session_state.args.current_follow_limit == 100
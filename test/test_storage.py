@@ -0,0 +1,413 @@
+import gzip
+import io
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from GramAddict.core import storage as storage_module
+from GramAddict.core.storage import (
+    DATETIME_FORMAT,
+    FILENAME_HISTORY_FILTER_USERS,
+    FILENAME_INTERACTED_USERS,
+    FILENAME_INTERACTED_USERS_JOURNAL,
+    FILTER_HISTORY_FLUSH_EVERY,
+    LIST_CURSOR_MAX_AGE_HOURS,
+    FollowingStatus,
+    InteractedUser,
+    InteractionCounters,
+    ListCursors,
+    Storage,
+    create_storage,
+    to_epoch,
+    flush_storages,
+    iter_json_object,
+)
+
+
+@pytest.fixture
+def account_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "accounts" / "test_user"
+
+
+def test_journal_appends_one_line_per_interaction(account_dir):
+    storage = Storage("test_user", journal=True)
+    storage.add_interacted_user("user1", session_id="1", liked=2)
+    storage.add_interacted_user("user2", session_id="1", followed=True)
+
+    assert not os.path.exists(account_dir / FILENAME_INTERACTED_USERS)
+    with open(account_dir / FILENAME_INTERACTED_USERS_JOURNAL) as journal:
+        lines = journal.readlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])["username"] == "user2"
+    storage.close()
+
+
+def test_journal_is_replayed_and_compacted(account_dir):
+    storage = Storage("test_user", journal=True)
+    storage.add_interacted_user("user1", session_id="1", liked=2)
+    storage.add_interacted_user("user1", session_id="2", liked=1, followed=True)
+    with open(account_dir / FILENAME_INTERACTED_USERS_JOURNAL, "a") as journal:
+        journal.write('{"username": "trunc')
+
+    reloaded = Storage("test_user", journal=True)
+    assert reloaded.interacted_users["user1"].liked == 3
+    assert reloaded.get_following_status("user1") == FollowingStatus.FOLLOWED
+
+    reloaded.close()
+    assert not os.path.exists(account_dir / FILENAME_INTERACTED_USERS_JOURNAL)
+    with open(account_dir / FILENAME_INTERACTED_USERS) as json_file:
+        assert json.load(json_file)["user1"]["session_id"] == "2"
+    storage.close()
+
+
+def test_sqlite_storage_imports_json_files(account_dir):
+    storage = Storage("test_user")
+    storage.add_interacted_user("user1", session_id="1", liked=2, followed=True)
+    storage.interacted_users["user1"].extra = {"legacy_key": "kept"}
+    storage._update_file()
+    storage.close()
+    with open(account_dir / "blacklist.txt", "w") as blacklist:
+        blacklist.write("bad_user\n")
+
+    sqlite_storage = create_storage("test_user", "sqlite")
+    interacted, last_interaction = sqlite_storage.check_user_was_interacted("user1")
+    assert interacted
+    assert last_interaction is not None
+    assert sqlite_storage.get_following_status("user1") == FollowingStatus.FOLLOWED
+    assert sqlite_storage.is_user_in_blacklist("bad_user")
+
+    sqlite_storage.add_interacted_user("user1", session_id="2", liked=1)
+    sqlite_storage.add_interacted_user("user2", session_id="2", unfollowed=True)
+    assert sqlite_storage.get_following_status("user2") == FollowingStatus.UNFOLLOWED
+    assert sqlite_storage._get_interacted_user("user1").liked == 3
+    assert sqlite_storage._get_interacted_user("user1").extra == {"legacy_key": "kept"}
+    assert sqlite_storage._get_last_day_interactions_count() == 2
+    sqlite_storage.close()
+
+    # the database of an older version mirrored the txt files in tables
+    db = sqlite3.connect(account_dir / "storage.db")
+    with db:
+        db.execute("CREATE TABLE whitelist (username TEXT PRIMARY KEY)")
+        db.execute("PRAGMA user_version=2")
+    db.close()
+    sqlite_storage = create_storage("test_user", "sqlite")
+    assert sqlite_storage.is_user_in_blacklist("@Bad_User")
+    assert not sqlite_storage.is_user_in_whitelist("bad_user")
+    assert (
+        sqlite_storage.db.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'whitelist'"
+        ).fetchone()
+        is None
+    )
+    sqlite_storage.close()
+
+
+def test_filter_history_is_written_in_background(account_dir):
+    storage = Storage("test_user")
+    for n in range(FILTER_HISTORY_FLUSH_EVERY - 1):
+        storage.add_filter_user(
+            f"user{n}", SimpleNamespace(is_restricted=True, follow_button_text=None)
+        )
+    assert not os.path.exists(account_dir / FILENAME_HISTORY_FILTER_USERS)
+
+    flush_storages()
+    with open(account_dir / FILENAME_HISTORY_FILTER_USERS) as json_file:
+        assert len(json.load(json_file)) == FILTER_HISTORY_FLUSH_EVERY - 1
+
+    storage.add_filter_user(
+        "last_user", SimpleNamespace(is_restricted=True, follow_button_text=None)
+    )
+    storage.close()
+    with open(account_dir / FILENAME_HISTORY_FILTER_USERS) as json_file:
+        assert json.load(json_file)["last_user"]["skip_reason"] is None
+
+
+def test_blacklist_is_normalized_and_supports_patterns(account_dir):
+    os.makedirs(account_dir)
+    blacklist_path = account_dir / "blacklist.txt"
+    with open(blacklist_path, "w") as blacklist:
+        blacklist.write("@Bad_User \n\nshop_*\n")
+
+    storage = Storage("test_user")
+    assert storage.is_user_in_blacklist("bad_user")
+    assert storage.is_user_in_blacklist("Shop_Sneakers")
+    assert not storage.is_user_in_blacklist("good_user")
+    assert not storage.is_user_in_whitelist("bad_user")
+    storage.close()
+
+    with open(blacklist_path, "a") as blacklist:
+        blacklist.write("good_user\n")
+    os.utime(blacklist_path, (0, 0))
+    storage = Storage("test_user")
+    assert storage.is_user_in_blacklist("good_user")
+    storage.close()
+
+
+def test_interacted_user_keeps_the_json_format():
+    user = {
+        "last_interaction": "2024-03-10 02:30:12.123456",
+        "following_status": "requested",
+        "session_id": "abc",
+        "job_name": "blogger-followers",
+        "target": "someone",
+        "liked": 2,
+        "watched": 0,
+        "commented": 1,
+        "followed": True,
+        "unfollowed": False,
+        "scraped": False,
+        "pm_sent": False,
+        "legacy_field": 1,
+    }
+    record = InteractedUser.from_dict(user)
+    assert record.following_status == FollowingStatus.REQUESTED
+    assert record.to_dict() == user
+
+
+def test_interaction_counters_rolling_window(tmp_path):
+    path = tmp_path / "interaction_counters.json"
+    counters = InteractionCounters(path)
+    hour = InteractionCounters._current_hour()
+    counters.buckets = {hour - 30: {"likes": 5}, hour - 200: {"likes": 7}}
+    counters.add_interaction(followed=True, unfollowed=False, liked=2, pm_sent=False)
+
+    assert counters.count("likes", hours=24) == 2
+    assert counters.count("likes", hours=24 * 7) == 7
+    assert counters.count("follows") == 1
+    assert hour - 200 not in counters.buckets
+    # written by the engine once the interaction is stored
+    assert not os.path.exists(path)
+    counters.save()
+    assert InteractionCounters(path).count("interactions") == 1
+
+
+def test_interaction_counters_are_seeded_and_count_users_once(account_dir):
+    storage = Storage("test_user")
+    storage.add_interacted_user("user1", session_id="1", liked=2)
+    storage.add_interacted_user("user2", session_id="1", followed=True)
+    storage.interacted_users["user2"].last_interaction = to_epoch(
+        datetime.now() - timedelta(days=10)
+    )
+    storage._update_file()
+    storage.close()
+    os.remove(account_dir / "interaction_counters.json")
+
+    # the first run after the update starts from the interacted users
+    storage = Storage("test_user")
+    assert storage.interaction_counters.count("likes") == 2
+    assert storage.interaction_counters.count("follows", hours=24 * 7) == 0
+    storage.add_interacted_user("user1", session_id="2", liked=1)
+    storage.add_interacted_user("user3", session_id="2", liked=1)
+    assert storage._get_last_day_interactions_count() == 2
+    assert storage.interaction_counters.count("interactions") == 3
+    storage.close()
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_interaction_counters_survive_a_hard_kill(account_dir, journal):
+    storage = Storage("test_user", journal=journal)
+    storage.add_interacted_user("user1", session_id="1", liked=2)
+    storage.add_interacted_user("user2", session_id="1", liked=3, followed=True)
+    storage.add_interacted_user("user1", session_id="1", liked=1)
+    # killed: nothing is flushed
+    storage.closed = True
+
+    storage = Storage("test_user", journal=journal)
+    assert storage.interaction_counters.count("likes") == 6
+    assert storage.interaction_counters.count("follows") == 1
+    assert storage.interaction_counters.count("interactions") == 3
+    assert storage._get_last_day_interactions_count() == 2
+    storage.close()
+    # the replayed interactions aren't counted twice
+    storage = Storage("test_user", journal=journal)
+    assert storage.interaction_counters.count("likes") == 6
+    storage.close()
+
+
+def test_iter_json_object_streams_in_small_chunks():
+    data = {"a": {"liked": 10, "bio": 'x {y}, "z"'}, "b": 12345, "c": [1, 2]}
+    pairs = list(
+        iter_json_object(io.StringIO(json.dumps(data, indent=4)), chunk_size=3)
+    )
+    assert dict(pairs) == data
+    assert list(iter_json_object(io.StringIO(" {\n} "))) == []
+
+
+def test_lazy_storage_appends_filter_history(account_dir):
+    storage = Storage("test_user")
+    storage.add_interacted_user("user1", session_id="1", liked=2)
+    storage.add_filter_user(
+        "old_user", SimpleNamespace(is_restricted=True, follow_button_text=None)
+    )
+    storage.close()
+
+    lazy_storage = Storage("test_user", lazy=True)
+    assert lazy_storage.check_user_was_interacted("user1")[0]
+    assert lazy_storage.history_filter_users == {}
+    lazy_storage.add_filter_user(
+        "new_user", SimpleNamespace(is_restricted=True, follow_button_text=None)
+    )
+    lazy_storage.close()
+    assert lazy_storage.get_filter_user("old_user") is not None
+    assert lazy_storage.get_filter_user("new_user") is not None
+    assert lazy_storage.get_filter_user("unknown") is None
+
+    storage = Storage("test_user")
+    assert set(storage.history_filter_users) == {"old_user", "new_user"}
+    storage.close()
+    assert not os.path.exists(account_dir / "history_filters_users.jsonl")
+
+
+def test_sqlite_storage_gets_filter_user(account_dir):
+    sqlite_storage = create_storage("test_user", "sqlite")
+    sqlite_storage.add_filter_user(
+        "filtered", SimpleNamespace(is_restricted=True, follow_button_text=None)
+    )
+    assert sqlite_storage.get_filter_user("filtered")["is_restricted"]
+    assert sqlite_storage.get_filter_user("unknown") is None
+    sqlite_storage.close()
+
+
+def test_sqlite_archive_vacuums_only_after_deleting(account_dir):
+    sqlite_storage = create_storage("test_user", "sqlite")
+    sqlite_storage.add_interacted_user("new_user", session_id="1", liked=1)
+    statements = []
+    sqlite_storage.db.set_trace_callback(statements.append)
+    assert sqlite_storage.archive(90) == (0, 0)
+    assert "VACUUM" not in statements
+
+    with sqlite_storage.db:
+        sqlite_storage.db.execute(
+            "UPDATE interacted_users SET last_interaction = ?",
+            ((datetime.now() - timedelta(days=100)).strftime(DATETIME_FORMAT),),
+        )
+    assert sqlite_storage.archive(90) == (1, 0)
+    assert "VACUUM" in statements
+    sqlite_storage.close()
+
+
+def test_archive_moves_old_records(account_dir):
+    storage = Storage("test_user")
+    old = to_epoch(datetime.now() - timedelta(days=100))
+    storage.add_interacted_user("old_user", session_id="1", liked=1)
+    storage.add_interacted_user("old_followed", session_id="1", followed=True)
+    storage.add_interacted_user("new_user", session_id="2", liked=1)
+    storage.interacted_users["old_user"].last_interaction = old
+    storage.interacted_users["old_followed"].last_interaction = old
+    storage.history_filter_users = {
+        "old_filtered": {"datetime": str(datetime.now() - timedelta(days=100))},
+        "new_filtered": {
+            "datetime": str(datetime.now()),
+            "biography": "",
+            "potency_ratio": 0.5,
+        },
+    }
+    storage.filter_history_pending = 1
+
+    assert storage.archive(90) == (1, 1)
+    storage.close()
+
+    reloaded = Storage("test_user")
+    assert set(reloaded.interacted_users) == {"old_followed", "new_user"}
+    assert reloaded.history_filter_users == {
+        "new_filtered": {
+            "datetime": storage.history_filter_users["new_filtered"]["datetime"]
+        }
+    }
+    reloaded.close()
+    archived = {}
+    for name in os.listdir(account_dir / "archive"):
+        with gzip.open(account_dir / "archive" / name, "rt") as archive:
+            archived[name.split("-")[0]] = [json.loads(line) for line in archive]
+    assert archived["interacted_users"][0]["username"] == "old_user"
+    assert archived["history_filters_users"][0]["username"] == "old_filtered"
+
+
+def test_archive_without_old_records_rewrites_nothing(account_dir, mocker):
+    storage = Storage("test_user", journal=True)
+    storage.add_interacted_user("new_user", session_id="1", liked=1)
+    storage.add_filter_user(
+        "new_filtered", SimpleNamespace(is_restricted=True, follow_button_text=None)
+    )
+    storage.flush_filter_history()
+    update_file = mocker.spy(storage, "_update_file")
+    rewrite = mocker.spy(storage_module, "write_json_object")
+    assert storage.archive(90) == (0, 0)
+    update_file.assert_not_called()
+    rewrite.assert_not_called()
+    assert storage.journal_entries == 1
+    storage.close()
+
+
+def test_shared_storage_between_accounts(account_dir):
+    first = create_storage("first", shared=True)
+    second = create_storage("second", shared=True)
+    first.add_filter_user(
+        "rejected",
+        SimpleNamespace(is_restricted=True, follow_button_text=None),
+        SimpleNamespace(name="NOT_ENOUGH_POSTS"),
+    )
+    first.add_interacted_user("interacted", session_id="1", liked=1)
+
+    assert second.check_user_was_seen_by_other_accounts("rejected", 24) == (
+        "first",
+        "NOT_ENOUGH_POSTS",
+    )
+    assert second.check_user_was_seen_by_other_accounts("interacted", 24) == (
+        "first",
+        None,
+    )
+    assert first.check_user_was_seen_by_other_accounts("rejected", 24) is None
+    assert second.check_user_was_seen_by_other_accounts("unknown", 24) is None
+    first.close()
+    second.close()
+
+
+def test_list_cursors(tmp_path):
+    path = tmp_path / "list_cursors.json"
+    cursors = ListCursors(path)
+    cursors.advance("blogger-followers", "someone", "user1")
+    cursors.advance("blogger-followers", "someone", "user9")
+    assert cursors.get("blogger-followers", "other") is None
+
+    reloaded = ListCursors(path)
+    cursor = reloaded.get("blogger-followers", "someone")
+    assert cursor["scrolls"] == 2
+    assert cursor["username"] == "user9"
+    reloaded.cursors["blogger-followers:someone"]["updated"] -= (
+        LIST_CURSOR_MAX_AGE_HOURS * 3600 + 1
+    )
+    assert reloaded.get("blogger-followers", "someone") is None
+    assert ListCursors(path).cursors == {}
+
+
+def test_resume_list_stops_at_the_last_user_seen(tmp_path):
+    from GramAddict.core.handle_sources import RESUME_MAX_STEPS, resume_list
+
+    storage = SimpleNamespace(list_cursors=ListCursors(tmp_path / "cursors.json"))
+    for username in ("user1", "user2", "user3", "user4"):
+        storage.list_cursors.advance("unfollow", "me", username)
+    self = SimpleNamespace(args=SimpleNamespace(resume_lists=True))
+    # two users were unfollowed meanwhile: user4 shows up after two steps
+    screens = [["user1"], ["user2", "user3"], ["user4"], ["user5"]]
+    moves = []
+
+    def is_visible(username):
+        return username in screens[len(moves)]
+
+    resume_list(self, storage, "unfollow", "me", lambda: moves.append(1), is_visible)
+    assert len(moves) == 2
+    assert storage.list_cursors.get("unfollow", "me")["scrolls"] == 2
+    assert storage.list_cursors.get("unfollow", "me")["username"] == "user4"
+
+    for _ in range(RESUME_MAX_STEPS * 2):
+        storage.list_cursors.advance("unfollow", "me", None)
+    moves.clear()
+    resume_list(self, storage, "unfollow", "me", lambda: moves.append(1))
+    assert len(moves) == RESUME_MAX_STEPS
+    assert storage.list_cursors.get("unfollow", "me")["scrolls"] == RESUME_MAX_STEPS
@@ -0,0 +1,28 @@
+from GramAddict.core.ui_timeouts import (
+    EXPLORE_EVERY,
+    MIN_SAMPLES,
+    MIN_TIMEOUT,
+    UiTimeouts,
+)
+
+
+def test_ui_timeouts_are_learned_per_selector(tmp_path):
+    path = tmp_path / "ui_timeouts.json"
+    timeouts = UiTimeouts("serial", path)
+    for _ in range(MIN_SAMPLES + 1):
+        timeouts.record("resourceId=profile", 0.8, found=True)
+        timeouts.record("resourceId=restricted", 8, found=False)
+    assert timeouts.get("resourceId=profile", 8) == 0.8 * 1.5
+    assert timeouts.get("resourceId=restricted", 8) == MIN_TIMEOUT
+    assert timeouts.get("resourceId=unknown", 8) == 8
+    assert timeouts.get(None, 8) == 8
+
+    timeouts.save()
+    reloaded = UiTimeouts("serial", path)
+    assert reloaded.get("resourceId=profile", 1) == 1
+    assert UiTimeouts("other", path).get("resourceId=profile", 8) == 8
+
+    for _ in range(EXPLORE_EVERY - MIN_SAMPLES - 1):
+        reloaded.record("resourceId=restricted", 0.5, found=False)
+    # from time to time we wait the whole timeout, in case it's slower now
+    assert reloaded.get("resourceId=restricted", 8) == 8